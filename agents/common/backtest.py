@@ -0,0 +1,192 @@
+"""
+Offline backtesting of portfolio allocation strategies over recorded prices
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import csv
+import json
+import numpy as np
+
+# Same 0.1% fee the executor charges per trade
+TRADE_FEE_RATE = 0.001
+
+Allocator = Callable[[str, float], Dict[str, float]]
+
+@dataclass(frozen=True)
+class StrategyConfig:
+    risk_level: str = 'medium'
+    rebalance_every: int = 0  # ticks between calendar rebalances, 0 disables
+    drift_threshold: float = 0.05  # max weight drift before a rebalance
+    fee_rate: float = TRADE_FEE_RATE
+    initial_capital: float = 10_000.0
+
+@dataclass
+class BacktestResult:
+    config: StrategyConfig
+    equity_curve: np.ndarray
+    total_return: float
+    sharpe_ratio: float
+    max_drawdown: float
+    trades: int
+    fees_paid: float
+
+    def summary(self) -> Dict:
+        """JSON-friendly result without the equity curve"""
+        return {
+            'config': asdict(self.config),
+            'final_equity': float(self.equity_curve[-1]),
+            'total_return': self.total_return,
+            'sharpe_ratio': self.sharpe_ratio,
+            'max_drawdown': self.max_drawdown,
+            'trades': self.trades,
+            'fees_paid': self.fees_paid,
+        }
+
+def load_price_history(path: Path) -> Tuple[List[str], np.ndarray]:
+    """Load recorded prices as (symbols, prices[ticks, symbols])
+
+    Accepts a wide CSV (``timestamp,BTC,ETH,...``) or a JSON object mapping
+    each symbol to an equally long list of prices. Every price must be
+    positive; raises ValueError otherwise.
+    """
+    path = Path(path)
+    if path.suffix == '.json':
+        with open(path) as f:
+            data = json.load(f)
+        symbols = list(data.keys())
+        prices = np.array([data[s] for s in symbols], dtype=float).T
+    else:
+        with open(path, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            symbols = [h for h in header if h != 'timestamp']
+            columns = [header.index(s) for s in symbols]
+            prices = np.array([[float(row[i]) for i in columns] for row in reader], dtype=float)
+
+    if prices.ndim != 2 or len(prices) < 2:
+        raise ValueError(f"Need at least two ticks of prices in {path}")
+    # Returns are ratios of prices, so one bad price would poison every metric
+    bad = np.argwhere(~(np.isfinite(prices) & (prices > 0)))
+    if len(bad):
+        tick, column = bad[0]
+        raise ValueError(
+            f"Non-positive or missing price {prices[tick, column]} for {symbols[column]} at tick {tick} in {path}"
+        )
+    return symbols, prices
+
+def target_weights(allocations: Dict[str, float], symbols: Sequence[str]) -> np.ndarray:
+    """Allocation weights aligned to ``symbols``, renormalized over tradable assets"""
+    weights = np.array([allocations.get(s, 0.0) for s in symbols], dtype=float)
+    total = weights.sum()
+    if total <= 0:
+        raise ValueError("Allocation has no overlap with the recorded symbols")
+    return weights / total
+
+def max_drawdown(equity: np.ndarray) -> float:
+    """Largest peak-to-trough loss as a fraction of the peak"""
+    peaks = np.maximum.accumulate(equity)
+    return float(np.max(1.0 - equity / peaks))
+
+def sharpe_ratio(equity: np.ndarray, periods_per_year: float) -> float:
+    """Annualized Sharpe ratio of per-tick returns (zero risk-free rate)"""
+    returns = np.diff(equity) / equity[:-1]
+    std = returns.std(ddof=1) if len(returns) > 1 else 0.0
+    if std == 0:
+        return 0.0
+    return float(returns.mean() / std * np.sqrt(periods_per_year))
+
+def run_backtest(
+    prices: np.ndarray,
+    symbols: Sequence[str],
+    config: StrategyConfig,
+    allocator: Allocator,
+    periods_per_year: float,
+) -> BacktestResult:
+    """Replay prices through an allocator with rebalancing and trade fees"""
+    target = target_weights(allocator(config.risk_level, config.initial_capital), symbols)
+
+    equity = np.empty(len(prices))
+    units = np.zeros(len(symbols))
+    cash = config.initial_capital
+    trades = 0
+    fees_paid = 0.0
+
+    for t, tick in enumerate(prices):
+        holdings = units * tick
+        value = cash + holdings.sum()
+
+        due = t == 0 or (config.rebalance_every and t % config.rebalance_every == 0)
+        if not due and value > 0:
+            drift = np.abs(holdings / value - target).max()
+            due = drift > config.drift_threshold
+
+        if due:
+            desired = target * value
+            turnover = np.abs(desired - holdings)
+            fee = turnover.sum() * config.fee_rate
+            # Pay fees pro rata out of the rebalanced book
+            units = target * (value - fee) / tick
+            cash = 0.0
+            trades += int(np.count_nonzero(turnover > 1e-9))
+            fees_paid += fee
+            value -= fee
+
+        equity[t] = value
+
+    return BacktestResult(
+        config=config,
+        equity_curve=equity,
+        total_return=float(equity[-1] / config.initial_capital - 1.0),
+        sharpe_ratio=sharpe_ratio(equity, periods_per_year),
+        max_drawdown=max_drawdown(equity),
+        trades=trades,
+        fees_paid=float(fees_paid),
+    )
+
+# Per-process state for parallel runs, set once by the pool initializer
+_WORKER_STATE: Dict = {}
+
+def _init_worker(prices: np.ndarray, symbols: Sequence[str], periods_per_year: float, allocator: Optional[Allocator]):
+    if allocator is None:
+        from common.portfolio import optimize_portfolio
+        allocator = optimize_portfolio
+    _WORKER_STATE.update(
+        prices=prices, symbols=symbols, periods_per_year=periods_per_year, allocator=allocator
+    )
+
+def _run_worker(config: StrategyConfig) -> BacktestResult:
+    return run_backtest(
+        _WORKER_STATE['prices'],
+        _WORKER_STATE['symbols'],
+        config,
+        _WORKER_STATE['allocator'],
+        _WORKER_STATE['periods_per_year'],
+    )
+
+def run_grid(
+    prices: np.ndarray,
+    symbols: Sequence[str],
+    configs: Sequence[StrategyConfig],
+    periods_per_year: float,
+    allocator: Optional[Allocator] = None,
+    workers: Optional[int] = None,
+) -> List[BacktestResult]:
+    """Backtest many strategy configurations across processes
+
+    ``allocator`` defaults to the portfolio manager's ``optimize_portfolio``
+    from ``common.portfolio``; a custom allocator must be picklable (a
+    module-level function).
+    """
+    if workers == 1:
+        _init_worker(prices, symbols, periods_per_year, allocator)
+        return [_run_worker(config) for config in configs]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(prices, symbols, periods_per_year, allocator),
+    ) as pool:
+        return list(pool.map(_run_worker, configs, chunksize=max(1, len(configs) // 32)))
@@ -0,0 +1,73 @@
+"""
+Agent handlers declared up front, with the networked agent built on demand
+
+Constructing a ``uagents.Agent`` contacts the Almanac ledger straight
+away, so an agent module that built one at import time could not even be
+loaded offline. Agent modules therefore declare their handlers on an
+:class:`AgentBlueprint`, which offers the same decorators. Running the
+agent builds the real Agent from it; the load test and the test suite
+instead attach the message handlers to a simulated network node.
+"""
+
+from typing import Any, Callable, List, Tuple, Type
+
+from common.models import Model
+
+class AgentBlueprint:
+    """Name, constructor options and handlers of one agent"""
+
+    def __init__(self, name: str, **options: Any):
+        self.name = name
+        self.options = options
+        self.messages: List[Tuple[Type[Model], Any, bool, Callable]] = []
+        self.intervals: List[Tuple[float, Callable]] = []
+        self.events: List[Tuple[str, Callable]] = []
+        self.protocols: List[Tuple[Any, bool]] = []
+
+    def on_message(self, model: Type[Model], replies: Any = None, allow_unverified: bool = False):
+        def register(func: Callable) -> Callable:
+            self.messages.append((model, replies, allow_unverified, func))
+            return func
+        return register
+
+    def on_interval(self, period: float):
+        def register(func: Callable) -> Callable:
+            self.intervals.append((period, func))
+            return func
+        return register
+
+    def on_event(self, event_type: str):
+        def register(func: Callable) -> Callable:
+            self.events.append((event_type, func))
+            return func
+        return register
+
+    def include(self, protocol: Any, publish_manifest: bool = False):
+        self.protocols.append((protocol, publish_manifest))
+
+    def build(self):
+        """The networked ``uagents.Agent`` with every handler registered"""
+        from uagents import Agent
+
+        agent = Agent(name=self.name, **self.options)
+        for model, replies, allow_unverified, func in self.messages:
+            agent.on_message(model=model, replies=replies, allow_unverified=allow_unverified)(func)
+        for period, func in self.intervals:
+            agent.on_interval(period=period)(func)
+        for event_type, func in self.events:
+            agent.on_event(event_type)(func)
+        for protocol, publish_manifest in self.protocols:
+            agent.include(protocol, publish_manifest=publish_manifest)
+        return agent
+
+    def attach(self, node, intervals: bool = False):
+        """Register the message handlers (and optionally intervals) on a SimNode"""
+        for model, _, _, func in self.messages:
+            node.on_message(model, func)
+        if intervals:
+            for period, func in self.intervals:
+                node.on_interval(period, func)
+        return node
+
+    def run(self):
+        self.build().run()
@@ -0,0 +1,39 @@
+"""
+Load agent modules from their (hyphenated) directories
+"""
+
+import importlib.util
+import sys
+from pathlib import Path
+from types import ModuleType
+
+AGENTS_DIR = Path(__file__).resolve().parent.parent
+
+# Agent name -> directory under agents/
+AGENT_DIRS = {
+    'portfolio_manager': 'portfolio-manager',
+    'price_monitor': 'price-monitor',
+    'executor': 'executor',
+}
+
+def agent_path(name: str) -> Path:
+    """Path to the agent.py script for an agent name"""
+    if name not in AGENT_DIRS:
+        raise ValueError(f"Unknown agent: {name}")
+    return AGENTS_DIR / AGENT_DIRS[name] / "agent.py"
+
+def load_agent_module(name: str) -> ModuleType:
+    """Import an agent module once, registered as ``<name>_agent``"""
+    module_name = f"{name}_agent"
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    spec = importlib.util.spec_from_file_location(module_name, agent_path(name))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
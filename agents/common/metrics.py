@@ -0,0 +1,260 @@
+"""
+Counters, gauges and latency histograms with a Prometheus text endpoint
+
+Metrics are off unless ``AGENTGRID_METRICS`` is set. When off, every factory
+returns a shared no-op object and :func:`timed` leaves functions undecorated,
+so instrumented hot paths cost one attribute lookup and an empty call.
+"""
+
+from bisect import bisect_left
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+import os
+import time
+
+ENABLED = os.environ.get("AGENTGRID_METRICS", "").lower() in ("1", "true", "yes")
+
+# One in this many hot-path log lines is emitted
+HOT_LOG_EVERY = int(os.environ.get("AGENTGRID_LOG_EVERY", "100"))
+
+# Metrics endpoint for an agent listens on its agent port plus this offset
+METRICS_PORT_OFFSET = 1000
+
+# Seconds; spans sub-millisecond handlers up to multi-second task execution
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Noop:
+    """Stands in for any metric or timer when metrics are disabled"""
+
+    def labels(self, **labels):
+        return self
+
+    def inc(self, amount: float = 1.0):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NOOP = _Noop()
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+
+    def labels(self, **labels) -> "_Metric":
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self) -> "_Metric":
+        raise NotImplementedError
+
+    def _series(self):
+        """(label values, child) pairs, including the unlabelled metric"""
+        if not self.labelnames:
+            return [((), self)]
+        return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._series():
+            lines.extend(child._render_samples(self.name, self.labelnames, values))
+        return lines
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0.0
+
+    def _new_child(self):
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def _render_samples(self, name, labelnames, values):
+        return [f"{name}_total{_format_labels(labelnames, values)} {self.value}"]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.value = 0.0
+
+    def _new_child(self):
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def _render_samples(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {self.value}"]
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: "Histogram"):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+
+    def _new_child(self):
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+    def _render_samples(self, name, labelnames, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, values)} {self.sum}")
+        lines.append(f"{name}_count{_format_labels(labelnames, values)} {cumulative}")
+        return lines
+
+REGISTRY: Dict[str, _Metric] = {}
+
+def _register(metric: _Metric):
+    if not ENABLED:
+        return NOOP
+    return REGISTRY.setdefault(metric.name, metric)
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()):
+    return _register(Counter(name, documentation, labelnames))
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()):
+    return _register(Gauge(name, documentation, labelnames))
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+# Message handling, shared by every agent
+MESSAGES = counter("agent_messages", "Messages handled", ("model",))
+MESSAGE_SECONDS = histogram("agent_message_seconds", "Message handler latency", ("model",))
+MESSAGE_ERRORS = counter("agent_message_errors", "Message handlers that raised", ("model",))
+
+def timed(model: str):
+    """Count and time an async message handler; a no-op when metrics are off"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        calls = MESSAGES.labels(model=model)
+        latency = MESSAGE_SECONDS.labels(model=model)
+        errors = MESSAGE_ERRORS.labels(model=model)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            calls.inc()
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except BaseException:
+                errors.inc()
+                raise
+            finally:
+                latency.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def render() -> str:
+    """All registered metrics in Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await reader.readline()
+        # Drain headers; the request body is never used
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode(errors="replace").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, body = "200 OK", render().encode()
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+async def start_metrics_server(agent_port: int, host: str = "127.0.0.1") -> Optional[asyncio.AbstractServer]:
+    """Serve ``/metrics`` on ``agent_port + METRICS_PORT_OFFSET`` if metrics are enabled"""
+    if not ENABLED:
+        return None
+    return await asyncio.start_server(_handle_scrape, host, agent_port + METRICS_PORT_OFFSET)
+
+class LogSampler:
+    """Lets one in every ``every`` hot-path log lines through"""
+
+    __slots__ = ("every", "count")
+
+    def __init__(self, every: int = HOT_LOG_EVERY):
+        self.every = max(1, every)
+        self.count = 0
+
+    def ready(self) -> bool:
+        self.count += 1
+        if self.count >= self.every:
+            self.count = 0
+            return True
+        return False
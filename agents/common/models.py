@@ -0,0 +1,152 @@
+"""
+Message models shared between agents
+
+Only ``uagents_core`` is imported here, not the full uagents runtime, so
+scripts and tests can build and validate messages without loading the
+agent stack.
+"""
+
+from typing import Dict, List, Optional, Any
+from enum import Enum
+
+try:
+    from uagents_core.models import Model
+except ImportError:  # uagents releases that predate uagents-core
+    from uagents import Model
+
+# Portfolio management
+
+class PortfolioRequest(Model):
+    user_address: str
+    risk_level: str  # 'low', 'medium', 'high'
+    amount: float
+    preferences: Optional[Dict[str, Any]] = None
+
+class PortfolioResponse(Model):
+    allocations: Dict[str, float]
+    expected_return: float
+    risk_score: float
+    recommendations: List[str]
+    timestamp: str
+    var_95: float = 0.0  # 1-day 95% value-at-risk, same units as amount
+    cvar_95: float = 0.0  # 1-day 95% expected shortfall
+
+# Price monitoring and alerts
+
+class PriceAlert(Model):
+    symbol: str
+    target_price: float
+    condition: str  # 'above', 'below', 'change'
+    user_address: str
+    alert_id: str
+
+class PriceAlertTriggered(Model):
+    alert_id: str
+    symbol: str
+    condition: str
+    target_price: float
+    price: float
+    user_address: str
+    timestamp: str
+
+class PriceUpdate(Model):
+    symbol: str
+    price: float
+    timestamp: str
+    change_24h: float = 0.0
+    volume_24h: float = 0.0
+
+class PriceData(Model):
+    symbol: str
+    price: float
+    change_24h: float
+    volume_24h: float
+    market_cap: float
+    timestamp: str
+
+# Admission control (see common.ratelimit); the executor answers with a
+# REJECTED TaskResult instead
+
+class RequestRejected(Model):
+    request: str  # model name of the rejected message
+    reason: str
+    retry_after: float  # seconds
+    timestamp: str
+    request_id: Optional[str] = None
+
+# Executor task protocol, also spoken by the shard router
+
+class TaskStatus(str, Enum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    REJECTED = "rejected"  # refused by admission control; safe to retry later
+
+class TaskType(str, Enum):
+    TRADE = "trade"
+    STAKE = "stake"
+    UNSTAKE = "unstake"
+    SWAP = "swap"
+    BRIDGE = "bridge"
+    CUSTOM = "custom"
+
+class ExecutionTask(Model):
+    task_id: str
+    task_type: TaskType
+    user_address: str
+    parameters: Dict[str, Any]
+    priority: int = 1
+    deadline: Optional[str] = None
+
+class TaskResult(Model):
+    task_id: str
+    status: TaskStatus
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    gas_used: Optional[int] = None
+    transaction_hash: Optional[str] = None
+    timestamp: str
+
+class TaskUpdate(Model):
+    task_id: str
+    status: TaskStatus
+    progress: float  # 0.0 to 1.0
+    message: str
+    timestamp: str
+
+# Executor shard membership and status
+
+class ShardHeartbeat(Model):
+    shard_id: str
+    queue_depth: int
+    active_tasks: int
+    completed_tasks: int
+    failed_tasks: int
+    timestamp: str
+
+class ExecutorStatusRequest(Model):
+    request_id: str
+
+class ExecutorStatus(Model):
+    request_id: str
+    shards: Dict[str, Dict[str, int]]
+    queue_depth: int
+    active_tasks: int
+    completed_tasks: int
+    failed_tasks: int
+    timestamp: str
+
+# Wire codec negotiation and batched frames (see common.wire)
+
+class WireHello(Model):
+    agent_name: str
+    codecs: List[str]
+    reply: bool = True  # False on answers, so two peers never ping-pong
+
+class CompactFrame(Model):
+    codec: str
+    model: str
+    count: int
+    payload: str  # base64 msgpack frame, or JSON list for the json codec
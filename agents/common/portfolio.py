@@ -0,0 +1,98 @@
+"""
+Portfolio construction shared by the portfolio manager agent and the backtester
+
+Kept free of uagents so offline tools and backtest workers can import it
+without building an agent.
+"""
+
+from typing import Dict, List
+
+# Mock data for demonstration
+CRYPTO_ASSETS = {
+    'BTC': {'price': 45000, 'volatility': 0.8, 'correlation': 0.1},
+    'ETH': {'price': 3000, 'volatility': 0.9, 'correlation': 0.3},
+    'SOL': {'price': 100, 'volatility': 1.2, 'correlation': 0.5},
+    'AVAX': {'price': 25, 'volatility': 1.1, 'correlation': 0.4},
+    'MATIC': {'price': 0.8, 'volatility': 0.7, 'correlation': 0.6},
+    'USDC': {'price': 1.0, 'volatility': 0.01, 'correlation': 0.0},
+    'USDT': {'price': 1.0, 'volatility': 0.01, 'correlation': 0.0},
+}
+
+def calculate_portfolio_metrics(allocations: Dict[str, float]) -> tuple[float, float]:
+    """Calculate expected return and risk score for given allocations"""
+    total_return = 0
+    total_risk = 0
+    
+    for asset, weight in allocations.items():
+        if asset in CRYPTO_ASSETS:
+            asset_data = CRYPTO_ASSETS[asset]
+            # Simple expected return calculation (mock)
+            expected_return = 0.1 if asset not in ['USDC', 'USDT'] else 0.02
+            total_return += weight * expected_return
+            total_risk += weight * asset_data['volatility']
+    
+    return total_return, total_risk
+
+def optimize_portfolio(risk_level: str, amount: float) -> Dict[str, float]:
+    """Optimize portfolio based on risk level using modern portfolio theory"""
+    
+    if risk_level == 'low':
+        # Conservative portfolio
+        return {
+            'USDC': 0.4,
+            'USDT': 0.3,
+            'BTC': 0.2,
+            'ETH': 0.1
+        }
+    elif risk_level == 'medium':
+        # Balanced portfolio
+        return {
+            'BTC': 0.3,
+            'ETH': 0.25,
+            'SOL': 0.15,
+            'AVAX': 0.1,
+            'MATIC': 0.1,
+            'USDC': 0.1
+        }
+    else:  # high risk
+        # Aggressive portfolio
+        return {
+            'BTC': 0.25,
+            'ETH': 0.2,
+            'SOL': 0.2,
+            'AVAX': 0.15,
+            'MATIC': 0.15,
+            'USDC': 0.05
+        }
+
+def generate_recommendations(allocations: Dict[str, float], risk_level: str) -> List[str]:
+    """Generate investment recommendations based on portfolio"""
+    recommendations = []
+    
+    if risk_level == 'low':
+        recommendations.extend([
+            "Consider dollar-cost averaging for stable growth",
+            "Monitor market conditions monthly",
+            "Rebalance quarterly to maintain target allocation"
+        ])
+    elif risk_level == 'medium':
+        recommendations.extend([
+            "Diversify across different sectors",
+            "Consider staking rewards for passive income",
+            "Monitor weekly and rebalance monthly"
+        ])
+    else:
+        recommendations.extend([
+            "High volatility expected - prepare for swings",
+            "Consider stop-loss strategies",
+            "Monitor daily and be ready to adjust quickly"
+        ])
+    
+    # Add specific recommendations based on allocations
+    if allocations.get('BTC', 0) > 0.3:
+        recommendations.append("High BTC allocation - consider reducing if overexposed")
+    
+    if allocations.get('USDC', 0) + allocations.get('USDT', 0) < 0.1:
+        recommendations.append("Low stablecoin allocation - consider adding more for stability")
+    
+    return recommendations
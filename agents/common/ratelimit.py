@@ -0,0 +1,230 @@
+"""
+Token-bucket admission control and fair queuing across senders
+
+Each agent keeps one bucket per sender plus one global bucket. A request is
+admitted only if both have a token, so a single noisy sender is throttled
+at its own rate while the global bucket caps total load. Work that is
+admitted but cannot run yet waits in a :class:`FairQueue`, which serves
+senders round-robin so a deep backlog from one sender never delays the
+next sender's first task, and runs each ordering key's work one item at a time.
+"""
+
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Set, Tuple
+import heapq
+import itertools
+import time
+
+from common import metrics
+
+# Rejection reasons, also used as metric labels
+SENDER_RATE = "sender_rate"
+GLOBAL_RATE = "global_rate"
+SENDER_QUEUE_FULL = "sender_queue_full"
+QUEUE_FULL = "queue_full"
+SENDER_LIMIT = "sender_limit"
+CAPACITY = "capacity"
+NOT_OWNER = "not_owner"
+
+REJECTIONS = metrics.counter("agent_rejections", "Requests rejected by admission control", ("model", "reason"))
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``burst``"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def available(self, now: float, tokens: float = 1.0) -> bool:
+        self._refill(now)
+        return self.tokens >= tokens
+
+    def take(self, tokens: float = 1.0):
+        self.tokens -= tokens
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Seconds until ``tokens`` will be available"""
+        missing = tokens - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+class AdmissionController:
+    """Per-sender and global token buckets for one kind of request
+
+    ``admit`` returns ``None`` when the request may proceed, otherwise the
+    rejection reason; ``retry_after`` then tells the sender when to retry.
+    Buckets of idle senders are evicted (least recently used first) once
+    more than ``max_senders`` are tracked, so memory stays bounded.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        sender_rate: float,
+        sender_burst: float,
+        global_rate: float,
+        global_burst: float,
+        max_senders: int = 10_000,
+    ):
+        self.model = model
+        self.sender_rate = sender_rate
+        self.sender_burst = sender_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.max_senders = max_senders
+        self.enabled = True
+        self._senders: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self._last_retry = 0.0
+
+    def _bucket(self, sender: Hashable, now: float) -> TokenBucket:
+        bucket = self._senders.get(sender)
+        if bucket is None:
+            bucket = self._senders[sender] = TokenBucket(self.sender_rate, self.sender_burst, now)
+            while len(self._senders) > self.max_senders:
+                self._senders.popitem(last=False)
+        else:
+            self._senders.move_to_end(sender)
+        return bucket
+
+    def admit(self, sender: Hashable, tokens: float = 1.0) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        now = time.monotonic()
+        bucket = self._bucket(sender, now)
+        if not bucket.available(now, tokens):
+            return self.reject(SENDER_RATE, bucket.retry_after(tokens))
+        if not self.global_bucket.available(now, tokens):
+            return self.reject(GLOBAL_RATE, self.global_bucket.retry_after(tokens))
+
+        # Only charge the sender once the request is actually admitted
+        bucket.take(tokens)
+        self.global_bucket.take(tokens)
+        return None
+
+    def reject(self, reason: str, retry_after: Optional[float] = None) -> str:
+        """Record a rejection decided here or by a later capacity check
+
+        Capacity rejections suggest waiting one global refill interval.
+        """
+        if retry_after is None:
+            rate = self.global_bucket.rate
+            retry_after = 1.0 / rate if rate > 0 else 1.0
+        self._last_retry = retry_after
+        REJECTIONS.labels(model=self.model, reason=reason).inc()
+        return reason
+
+    @property
+    def retry_after(self) -> float:
+        """Suggested wait in seconds for the most recently rejected request"""
+        return self._last_retry
+
+    def __len__(self):
+        return len(self._senders)
+
+class FairQueue:
+    """Bounded queue served round-robin across senders, one item per key at a time
+
+    Items carry an ordering ``key`` (the sender itself unless given). Each
+    key's items leave in the order they were pushed, and after ``pop``
+    hands out an item its key is skipped until ``done`` is called for it,
+    so one key's items never run concurrently or out of order while other
+    keys, even from the same sender, still can. Senders take turns, and
+    each sender's ready keys take turns within it. Among ready senders, the
+    one whose next item has the highest priority goes first, round-robin
+    among equals. ``push`` refuses items once the queue holds ``max_depth``
+    items or the sender already has ``max_per_sender`` waiting.
+    """
+
+    def __init__(self, max_depth: int, max_per_sender: int):
+        self.max_depth = max_depth
+        self.max_per_sender = max_per_sender
+        self._queues: Dict[Hashable, Dict[Hashable, Deque[Tuple[float, Any]]]] = {}
+        self._pending: Dict[Hashable, int] = {}
+        # Keys with a waiting item and nothing in flight, per sender, in turn order
+        self._ready_keys: Dict[Hashable, Deque[Hashable]] = {}
+        # (-priority of next item, arrival order, sender) for senders with a ready key
+        self._ready: List[Tuple[float, int, Hashable]] = []
+        self._in_flight: Set[Tuple[Hashable, Hashable]] = set()
+        self._order = itertools.count()
+        self._depth = 0
+
+    def _schedule(self, sender: Hashable):
+        key = self._ready_keys[sender][0]
+        priority, _ = self._queues[sender][key][0]
+        heapq.heappush(self._ready, (-priority, next(self._order), sender))
+
+    def _key_ready(self, sender: Hashable, key: Hashable):
+        ready_keys = self._ready_keys.setdefault(sender, deque())
+        ready_keys.append(key)
+        if len(ready_keys) == 1:
+            self._schedule(sender)
+
+    def push(self, sender: Hashable, item: Any, priority: float = 0.0, key: Hashable = None) -> Optional[str]:
+        """Enqueue ``item``; returns the rejection reason if there is no room"""
+        if self._pending.get(sender, 0) >= self.max_per_sender:
+            return SENDER_QUEUE_FULL
+        if self._depth >= self.max_depth:
+            return QUEUE_FULL
+
+        key = sender if key is None else key
+        queue = self._queues.setdefault(sender, {}).setdefault(key, deque())
+        queue.append((priority, item))
+        self._pending[sender] = self._pending.get(sender, 0) + 1
+        self._depth += 1
+        if len(queue) == 1 and (sender, key) not in self._in_flight:
+            self._key_ready(sender, key)
+        return None
+
+    def pop(self) -> Tuple[Hashable, Hashable, Any]:
+        """Next (sender, key, item); the key stays in flight until :meth:`done`"""
+        _, _, sender = heapq.heappop(self._ready)
+        ready_keys = self._ready_keys[sender]
+        key = ready_keys.popleft()
+        keys = self._queues[sender]
+        _, item = keys[key].popleft()
+        if not keys[key]:
+            del keys[key]
+            if not keys:
+                del self._queues[sender]
+        if ready_keys:
+            self._schedule(sender)
+        else:
+            del self._ready_keys[sender]
+
+        self._in_flight.add((sender, key))
+        self._pending[sender] -= 1
+        if not self._pending[sender]:
+            del self._pending[sender]
+        self._depth -= 1
+        return sender, key, item
+
+    def done(self, sender: Hashable, key: Hashable = None):
+        """Mark the popped item finished so the next one for its key may be served"""
+        key = sender if key is None else key
+        self._in_flight.discard((sender, key))
+        if key in self._queues.get(sender, ()):
+            self._key_ready(sender, key)
+
+    def ready(self) -> bool:
+        """Whether ``pop`` has an item to hand out"""
+        return bool(self._ready)
+
+    def pending(self, sender: Hashable) -> int:
+        return self._pending.get(sender, 0)
+
+    def senders(self) -> int:
+        return len(self._queues)
+
+    def __len__(self):
+        return self._depth
+
+    def __bool__(self):
+        return self._depth > 0
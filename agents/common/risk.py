@@ -0,0 +1,219 @@
+"""
+Monte Carlo and historical-simulation value-at-risk for portfolio allocations
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import numpy as np
+
+# Scaling constants
+DAYS_PER_YEAR = 365.0
+SECONDS_PER_YEAR = DAYS_PER_YEAR * 24 * 60 * 60
+
+class RiskEngine:
+    """Vectorized VaR / CVaR engine with a cached Cholesky factor
+
+    The covariance matrix comes from the per-asset volatility and market
+    correlation in the asset table until enough price history has been
+    recorded, after which it is estimated from observed log returns. The
+    Cholesky factor is cached and recomputed when some price has moved more
+    than ``reprice_threshold`` since the last factorization, when the
+    aligned history first becomes long enough to replace the prior, and
+    every ``refresh_ticks`` ticks so the return estimate stays current.
+    The simulated asset returns are cached with the factor and dropped with
+    it, so valuations in between only reweight the same scenarios: they
+    are cheap and give identical requests identical answers.
+    """
+
+    def __init__(
+        self,
+        assets: Dict[str, Dict],
+        n_paths: int = 100_000,
+        batch_size: int = 25_000,
+        horizon_days: float = 1.0,
+        tick_seconds: float = 30.0,
+        history_size: int = 2_880,
+        min_history: int = 30,
+        reprice_threshold: float = 0.05,
+        refresh_ticks: int = 120,
+        seed: Optional[int] = None,
+    ):
+        self.assets = assets
+        self.n_paths = n_paths
+        self.batch_size = batch_size
+        self.horizon_days = horizon_days
+        self.tick_seconds = tick_seconds
+        self.min_history = min_history
+        self.reprice_threshold = reprice_threshold
+        self.refresh_ticks = refresh_ticks
+        self.rng = np.random.default_rng(seed)
+        self.history: Dict[str, Deque[float]] = {
+            symbol: deque(maxlen=history_size) for symbol in assets
+        }
+        # (symbols, cholesky factor scaled to horizon, prices at factorization,
+        #  whether it was estimated from history rather than the prior)
+        self._factor: Optional[Tuple[Tuple[str, ...], np.ndarray, np.ndarray, bool]] = None
+        # Simulated per-asset simple returns drawn from the cached factor, (paths, assets)
+        self._scenarios: Optional[np.ndarray] = None
+        # Price updates recorded since the last factorization
+        self._updates = 0
+
+    @property
+    def symbols(self) -> Tuple[str, ...]:
+        return tuple(self.assets.keys())
+
+    def update_price(self, symbol: str, price: float):
+        """Record a price tick and drop the cached factor if prices moved enough"""
+        if symbol not in self.history or price <= 0:
+            return
+        self.history[symbol].append(price)
+        self._updates += 1
+
+        if self._factor is None:
+            return
+        symbols, _, factor_prices, from_history = self._factor
+        if symbol not in symbols:
+            self.invalidate()
+            return
+        reference = factor_prices[symbols.index(symbol)]
+        if reference > 0 and abs(price / reference - 1.0) > self.reprice_threshold:
+            self.invalidate()
+        elif not from_history and self._has_history(symbols):
+            # Enough history to replace the prior with observed returns
+            self.invalidate()
+        elif self._updates >= self.refresh_ticks * len(symbols):
+            # One tick updates every symbol, so refresh_ticks ticks is this many updates
+            self.invalidate()
+
+    def history_snapshot(self) -> Dict[str, List[float]]:
+        """Recorded prices per symbol, oldest first"""
+        return {symbol: list(prices) for symbol, prices in self.history.items()}
+
+    def restore_history(self, history: Dict[str, List[float]]):
+        """Replace recorded prices, e.g. with a history_snapshot from before a restart"""
+        for symbol, prices in history.items():
+            if symbol in self.history:
+                self.history[symbol].clear()
+                self.history[symbol].extend(prices)
+        self.invalidate()
+
+    def invalidate(self):
+        """Force the Cholesky factor and scenarios to be rebuilt on the next valuation"""
+        self._factor = None
+        self._scenarios = None
+
+    def _current_prices(self, symbols: Tuple[str, ...]) -> np.ndarray:
+        return np.array([
+            self.history[s][-1] if self.history[s] else self.assets[s]['price']
+            for s in symbols
+        ], dtype=float)
+
+    def _has_history(self, symbols: Tuple[str, ...]) -> bool:
+        return min(len(self.history[s]) for s in symbols) - 1 >= self.min_history
+
+    def _returns_matrix(self, symbols: Tuple[str, ...]) -> Optional[np.ndarray]:
+        """Aligned per-tick log returns, shape (ticks, assets), or None if too short"""
+        if not self._has_history(symbols):
+            return None
+        length = min(len(self.history[s]) for s in symbols)
+        prices = np.array([list(self.history[s])[-length:] for s in symbols], dtype=float).T
+        return np.diff(np.log(prices), axis=0)
+
+    def covariance(self, symbols: Tuple[str, ...]) -> np.ndarray:
+        """Annualized covariance of log returns"""
+        returns = self._returns_matrix(symbols)
+        if returns is not None:
+            ticks_per_year = SECONDS_PER_YEAR / self.tick_seconds
+            cov = np.cov(returns, rowvar=False) * ticks_per_year
+            return np.atleast_2d(cov)
+
+        # One-factor prior: each asset loads on a common market factor
+        vols = np.array([self.assets[s]['volatility'] for s in symbols], dtype=float)
+        loadings = np.clip(
+            np.array([self.assets[s].get('correlation', 0.0) for s in symbols], dtype=float),
+            -0.99, 0.99,
+        )
+        corr = np.outer(loadings, loadings)
+        np.fill_diagonal(corr, 1.0)
+        return corr * np.outer(vols, vols)
+
+    def cholesky(self) -> Tuple[Tuple[str, ...], np.ndarray]:
+        """Return the cached horizon-scaled Cholesky factor, rebuilding if stale"""
+        symbols = self.symbols
+        if self._factor is not None and self._factor[0] == symbols:
+            return symbols, self._factor[1]
+
+        from_history = self._has_history(symbols)
+        cov = self.covariance(symbols) * (self.horizon_days / DAYS_PER_YEAR)
+        # Tiny ridge keeps near-singular (stablecoin) blocks positive definite
+        ridge = 1e-12 * max(float(np.trace(cov)), 1.0)
+        factor = np.linalg.cholesky(cov + ridge * np.eye(len(symbols)))
+        self._factor = (symbols, factor, self._current_prices(symbols), from_history)
+        self._scenarios = None
+        self._updates = 0
+        return symbols, factor
+
+    def scenarios(self) -> Tuple[Tuple[str, ...], np.ndarray]:
+        """Cached simulated simple returns per asset, drawn from the current factor"""
+        symbols, factor = self.cholesky()
+        if self._scenarios is None or len(self._scenarios) != self.n_paths:
+            scenarios = np.empty((self.n_paths, len(symbols)))
+            for start in range(0, self.n_paths, self.batch_size):
+                size = min(self.batch_size, self.n_paths - start)
+                shocks = self.rng.standard_normal((size, len(symbols))) @ factor.T
+                scenarios[start:start + size] = np.expm1(shocks)
+            self._scenarios = scenarios
+        return symbols, self._scenarios
+
+    def _weight_vector(self, allocations: Dict[str, float], symbols: Tuple[str, ...]) -> np.ndarray:
+        return np.array([allocations.get(s, 0.0) for s in symbols], dtype=float)
+
+    @staticmethod
+    def _tail_metrics(losses: np.ndarray, confidence: float) -> Tuple[float, float]:
+        """VaR and CVaR of a loss sample (losses are positive)"""
+        k = int(np.floor(confidence * len(losses)))
+        k = min(max(k, 0), len(losses) - 1)
+        var = float(np.partition(losses, k)[k])
+        tail = losses[losses >= var]
+        cvar = float(tail.mean()) if tail.size else var
+        return max(var, 0.0), max(cvar, 0.0)
+
+    def monte_carlo_var(self, allocations: Dict[str, float], confidence: float = 0.95) -> Tuple[float, float]:
+        """VaR and CVaR as a fraction of portfolio value via simulated paths"""
+        symbols, scenarios = self.scenarios()
+        weights = self._weight_vector(allocations, symbols)
+        if not weights.any():
+            return 0.0, 0.0
+        return self._tail_metrics(-(scenarios @ weights), confidence)
+
+    def historical_var(self, allocations: Dict[str, float], confidence: float = 0.95) -> Optional[Tuple[float, float]]:
+        """VaR and CVaR from recorded returns, or None without enough history"""
+        symbols = self.symbols
+        returns = self._returns_matrix(symbols)
+        if returns is None:
+            return None
+        weights = self._weight_vector(allocations, symbols)
+        if not weights.any():
+            return 0.0, 0.0
+
+        # Square-root-of-time scaling from tick to horizon returns
+        horizon_ticks = self.horizon_days * 24 * 60 * 60 / self.tick_seconds
+        scaled = returns * np.sqrt(horizon_ticks)
+        losses = -(np.expm1(scaled) @ weights)
+        return self._tail_metrics(losses, confidence)
+
+    def value_at_risk(
+        self,
+        allocations: Dict[str, float],
+        amount: float,
+        confidence: float = 0.95,
+        method: str = 'monte_carlo',
+    ) -> Tuple[float, float]:
+        """VaR and CVaR in the same currency units as ``amount``"""
+        result = None
+        if method == 'historical':
+            result = self.historical_var(allocations, confidence)
+        if result is None:
+            result = self.monte_carlo_var(allocations, confidence)
+        var, cvar = result
+        return var * amount, cvar * amount
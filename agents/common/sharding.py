@@ -0,0 +1,69 @@
+"""
+Consistent hashing for routing executor work across shards
+"""
+
+from bisect import bisect
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional
+
+# Front router identity, shared so the launcher can point shards at it
+ROUTER_NAME = "executor_router"
+ROUTER_SEED = "executor_router_seed_phrase_12345"
+ROUTER_PORT = 8010
+
+def _hash(key: str) -> int:
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hash ring with virtual nodes
+
+    Adding or removing a node only moves the keys that hashed to its
+    virtual nodes, so most users keep their shard across membership changes.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 128):
+        self.vnodes = vnodes
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self._nodes = set()
+        for node in nodes:
+            self.add(node)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(self._nodes)
+
+    def add(self, node: str) -> bool:
+        """Add a node; returns False if it was already present"""
+        if node in self._nodes:
+            return False
+        self._nodes.add(node)
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            # Skip the (astronomically rare) collision rather than steal a point
+            if point not in self._owners:
+                self._owners[point] = node
+        self._points = sorted(self._owners)
+        return True
+
+    def remove(self, node: str) -> bool:
+        """Remove a node; returns False if it was not present"""
+        if node not in self._nodes:
+            return False
+        self._nodes.discard(node)
+        self._owners = {p: n for p, n in self._owners.items() if n != node}
+        self._points = sorted(self._owners)
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        """Node owning ``key``, or None if the ring is empty"""
+        if not self._points:
+            return None
+        index = bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
@@ -0,0 +1,146 @@
+"""
+In-process simulated transport for running agents without a network
+
+Each node has an inbox drained by one task, matching uAgents, which awaits
+one message handler at a time per agent. ``ctx.send`` resolves the
+destination by agent name or address and enqueues the message directly,
+so whole agent graphs run in one event loop with no sockets.
+"""
+
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type
+import asyncio
+import logging
+
+from common.models import Model
+
+MessageHandler = Callable[..., Awaitable[None]]
+IntervalHandler = Callable[..., Awaitable[None]]
+
+class SimContext:
+    """The subset of ``uagents.Context`` the agent handlers use"""
+
+    def __init__(self, node: "SimNode"):
+        self.node = node
+        self.logger = node.logger
+
+    @property
+    def agent_name(self) -> str:
+        return self.node.name
+
+    @property
+    def address(self) -> str:
+        return self.node.address
+
+    async def send(self, destination: str, message: Model, **kwargs):
+        self.node.network.deliver(self.node.address, destination, message)
+
+class SimNode:
+    """One agent on the simulated network"""
+
+    def __init__(self, network: "SimNetwork", name: str, address: str, logger: logging.Logger):
+        self.network = network
+        self.name = name
+        self.address = address
+        self.logger = logger
+        self.handlers: Dict[Type[Model], MessageHandler] = {}
+        self.intervals: List[Tuple[float, IntervalHandler]] = []
+        self.inbox: "asyncio.Queue[Tuple[str, Model]]" = asyncio.Queue()
+        self.ctx = SimContext(self)
+        self.delivered = 0
+        self.unhandled = 0
+
+    def on_message(self, model: Type[Model], handler: MessageHandler):
+        self.handlers[model] = handler
+        return self
+
+    def on_interval(self, period: float, handler: IntervalHandler):
+        self.intervals.append((period, handler))
+        return self
+
+    async def _drain(self):
+        while True:
+            sender, message = await self.inbox.get()
+            handler = self.handlers.get(type(message))
+            try:
+                if handler is None:
+                    self.unhandled += 1
+                else:
+                    await handler(self.ctx, sender, message)
+                    self.delivered += 1
+            except Exception as e:
+                self.logger.error("Handler for %s raised: %s", type(message).__name__, e)
+            finally:
+                self.network._settle()
+
+    async def _tick(self, period: float, handler: IntervalHandler):
+        while True:
+            await asyncio.sleep(period)
+            try:
+                await handler(self.ctx)
+            except Exception as e:
+                self.logger.error("Interval handler %s raised: %s", handler.__name__, e)
+
+class SimNetwork:
+    """Routes messages between in-process agents by name or address"""
+
+    def __init__(self, log_level: int = logging.WARNING):
+        self.nodes: Dict[str, SimNode] = {}
+        self.log_level = log_level
+        self._tasks: List[asyncio.Task] = []
+        self._external: Set[asyncio.Task] = set()
+        self.dropped = 0
+        # Messages enqueued but not yet fully handled, across all nodes
+        self.pending = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def add_node(self, name: str, address: Optional[str] = None) -> SimNode:
+        address = address or f"sim://{name}"
+        logger = logging.getLogger(f"simnet.{name}")
+        logger.setLevel(self.log_level)
+        node = SimNode(self, name, address, logger)
+        # Agents address each other both by name and by address
+        self.nodes[name] = node
+        self.nodes[address] = node
+        return node
+
+    def deliver(self, sender: str, destination: str, message: Model):
+        node = self.nodes.get(destination)
+        if node is None:
+            self.dropped += 1
+            return
+        self.pending += 1
+        self._idle.clear()
+        node.inbox.put_nowait((sender, message))
+
+    def _settle(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self._idle.set()
+
+    def start(self):
+        # Anything already running belongs to the caller, not to the agents
+        self._external = asyncio.all_tasks()
+        for node in set(self.nodes.values()):
+            self._tasks.append(asyncio.create_task(node._drain()))
+            for period, handler in node.intervals:
+                self._tasks.append(asyncio.create_task(node._tick(period, handler)))
+
+    async def idle(self):
+        """Wait until every delivered message, and anything it sent, is handled
+
+        Tasks that handlers spawned (such as executor workers) count as
+        outstanding work too.
+        """
+        while True:
+            await self._idle.wait()
+            spawned = asyncio.all_tasks() - self._external - set(self._tasks) - {asyncio.current_task()}
+            if not spawned:
+                return
+            await asyncio.wait(spawned)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
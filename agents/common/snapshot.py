@@ -0,0 +1,130 @@
+"""
+Atomic, versioned snapshots of agent in-memory state
+
+A snapshot file is a fixed header followed by the encoded state:
+
+    b"AGSS" | format version (1 byte) | codec (1 byte) | payload
+
+The payload is msgpack when it is installed and JSON otherwise; the codec
+byte says which, so either kind reads back wherever its codec is present.
+Writes go to a temporary file in the same directory that is fsynced and
+then renamed over the old snapshot, so a crash mid-write leaves the
+previous snapshot intact. Each agent also stamps its own ``schema`` number
+into the state and ignores snapshots written under a different one.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional
+import json
+import os
+import tempfile
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+from common import metrics
+
+MAGIC = b"AGSS"
+FORMAT_VERSION = 1
+CODEC_MSGPACK = b"m"
+CODEC_JSON = b"j"
+HEADER_SIZE = len(MAGIC) + 2
+
+# Snapshots are on by default; AGENTGRID_SNAPSHOTS=0 starts every agent cold
+SNAPSHOTS_ENABLED = os.environ.get("AGENTGRID_SNAPSHOTS", "1").lower() not in ("0", "false", "no")
+SNAPSHOT_PERIOD = float(os.environ.get("AGENTGRID_SNAPSHOT_PERIOD", "10"))
+STATE_DIR = Path(os.environ.get("AGENTGRID_STATE_DIR") or Path(__file__).resolve().parent.parent / ".state")
+
+SNAPSHOT_SECONDS = metrics.histogram("agent_snapshot_seconds", "Snapshot encode and write time", ("op",))
+SNAPSHOT_BYTES = metrics.gauge("agent_snapshot_bytes", "Size of the last snapshot written")
+
+def encode_snapshot(state: Dict[str, Any]) -> bytes:
+    if msgpack is not None:
+        return MAGIC + bytes([FORMAT_VERSION]) + CODEC_MSGPACK + msgpack.packb(state, use_bin_type=True)
+    payload = json.dumps(state, separators=(",", ":")).encode()
+    return MAGIC + bytes([FORMAT_VERSION]) + CODEC_JSON + payload
+
+def decode_snapshot(data: bytes) -> Dict[str, Any]:
+    """Inverse of :func:`encode_snapshot`; raises ValueError on anything unreadable"""
+    if len(data) < HEADER_SIZE or not data.startswith(MAGIC):
+        raise ValueError("not an agent snapshot")
+    version, codec = data[len(MAGIC)], data[len(MAGIC) + 1:HEADER_SIZE]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported snapshot format version {version}")
+
+    payload = data[HEADER_SIZE:]
+    if codec == CODEC_MSGPACK:
+        if msgpack is None:
+            raise ValueError("snapshot needs msgpack, which is not installed")
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+    if codec == CODEC_JSON:
+        return json.loads(payload)
+    raise ValueError(f"unknown snapshot codec {codec!r}")
+
+def write_atomic(path: Path, data: bytes):
+    """Replace ``path`` with ``data`` so readers see the old or new file, never a mix"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+    # Persist the rename itself; not every platform can fsync a directory
+    try:
+        dir_fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+class Snapshotter:
+    """Saves and restores one agent's state under ``STATE_DIR/<name>.snapshot``"""
+
+    def __init__(self, name: str, schema: int, directory: Optional[Path] = None):
+        self.name = name
+        self.schema = schema
+        self.path = Path(directory or STATE_DIR) / f"{name}.snapshot"
+        self._last: Optional[bytes] = None
+
+    def save(self, state: Dict[str, Any]) -> bool:
+        """Write ``state`` if it changed since the last save; returns whether it wrote"""
+        with SNAPSHOT_SECONDS.labels(op="save").time():
+            data = encode_snapshot({"schema": self.schema, "state": state})
+            if data == self._last:
+                return False
+            write_atomic(self.path, data)
+        self._last = data
+        SNAPSHOT_BYTES.set(len(data))
+        return True
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """The saved state, or None if there is no snapshot for this schema
+
+        Raises ValueError if the file exists but cannot be decoded.
+        """
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        with SNAPSHOT_SECONDS.labels(op="load").time():
+            snapshot = decode_snapshot(data)
+        if snapshot.get("schema") != self.schema:
+            return None
+        self._last = data
+        return snapshot["state"]
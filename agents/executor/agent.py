@@ -1,69 +1,83 @@
-from uagents import Agent, Context, Model, Protocol
+from uagents import Context, Protocol
 from typing import List, Dict, Optional, Any
 import asyncio
 import json
+import os
+import sys
+import time
 from datetime import datetime
-from enum import Enum
+from pathlib import Path
 
-class TaskStatus(str, Enum):
-    PENDING = "pending"
-    IN_PROGRESS = "in_progress"
-    COMPLETED = "completed"
-    FAILED = "failed"
-    CANCELLED = "cancelled"
+# Shared agent modules live one level up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-class TaskType(str, Enum):
-    TRADE = "trade"
-    STAKE = "stake"
-    UNSTAKE = "unstake"
-    SWAP = "swap"
-    BRIDGE = "bridge"
-    CUSTOM = "custom"
-
-class ExecutionTask(Model):
-    task_id: str
-    task_type: TaskType
-    user_address: str
-    parameters: Dict[str, Any]
-    priority: int = 1
-    deadline: Optional[str] = None
+from common import metrics
+from common.blueprint import AgentBlueprint
+from common.metrics import start_metrics_server, timed
+from common.ratelimit import AdmissionController, FairQueue
+from common.models import (
+    ExecutionTask,
+    ShardHeartbeat,
+    TaskResult,
+    TaskStatus,
+    TaskType,
+    TaskUpdate,
+)
 
-class TaskResult(Model):
-    task_id: str
-    status: TaskStatus
-    result: Optional[Dict[str, Any]] = None
-    error: Optional[str] = None
-    gas_used: Optional[int] = None
-    transaction_hash: Optional[str] = None
-    timestamp: str
+# Replica settings, overridden by the launcher when running several executors
+EXECUTOR_REPLICA = int(os.environ.get("EXECUTOR_REPLICA", "0"))
+EXECUTOR_PORT = int(os.environ.get("EXECUTOR_PORT", "8003"))
+REPLICA_SUFFIX = f"_{EXECUTOR_REPLICA}" if EXECUTOR_REPLICA else ""
 
-class TaskUpdate(Model):
-    task_id: str
-    status: TaskStatus
-    progress: float  # 0.0 to 1.0
-    message: str
-    timestamp: str
+# Address of the shard router; when set this executor runs as a shard
+EXECUTOR_ROUTER = os.environ.get("EXECUTOR_ROUTER")
 
 # Initialize the executor agent
-executor_agent = Agent(
-    name="executor",
-    seed="executor_seed_phrase_12345",
-    port=8003,
-    endpoint=["http://127.0.0.1:8003/submit"]
+executor_agent = AgentBlueprint(
+    name=f"executor{REPLICA_SUFFIX}",
+    seed=f"executor_seed_phrase_12345{REPLICA_SUFFIX}",
+    port=EXECUTOR_PORT,
+    endpoint=[f"http://127.0.0.1:{EXECUTOR_PORT}/submit"]
 )
 
 executor_protocol = Protocol("Task Execution")
 
+# Admission control: per-sender and global submission rates
+TASK_SENDER_RATE = 5.0  # tasks per second
+TASK_SENDER_BURST = 20
+TASK_GLOBAL_RATE = 50.0
+TASK_GLOBAL_BURST = 100
+ADMISSION = AdmissionController(
+    "ExecutionTask", TASK_SENDER_RATE, TASK_SENDER_BURST, TASK_GLOBAL_RATE, TASK_GLOBAL_BURST
+)
+
+# Admitted tasks wait here, served round-robin across senders and in order per user
+MAX_QUEUE_DEPTH = 500
+MAX_QUEUED_PER_SENDER = 50
+MAX_CONCURRENT_TASKS = 3
+
 # Task queue and tracking
-TASK_QUEUE = []
+TASK_QUEUE = FairQueue(MAX_QUEUE_DEPTH, MAX_QUEUED_PER_SENDER)
 ACTIVE_TASKS = {}
 TASK_HISTORY = {}
+WORKERS = 0
+
+# Multiplier on simulated execution delays (simulations and load tests shrink it)
+EXECUTION_DELAY_SCALE = float(os.environ.get("EXECUTION_DELAY_SCALE", "1.0"))
+
+# Fee charged on executed trades (0.1%)
+TRADE_FEE_RATE = 0.001
+
+# Instrumentation
+TASK_SECONDS = metrics.histogram("executor_task_seconds", "execute_task duration", ("task_type", "status"))
+QUEUE_DEPTH = metrics.gauge("executor_queue_depth", "Tasks waiting in TASK_QUEUE")
+ACTIVE_TASK_COUNT = metrics.gauge("executor_active_tasks", "Tasks currently executing")
 
 async def execute_trade_task(task: ExecutionTask) -> TaskResult:
     """Execute a trading task"""
     try:
         # Simulate trade execution
-        await asyncio.sleep(2)  # Simulate network delay
+        await asyncio.sleep(2 * EXECUTION_DELAY_SCALE)  # Simulate network delay
         
         # Mock trade result
         result = {
@@ -71,7 +85,7 @@ async def execute_trade_task(task: ExecutionTask) -> TaskResult:
             'amount': task.parameters.get('amount', 0.1),
             'price': task.parameters.get('price', 45000),
             'side': task.parameters.get('side', 'buy'),
-            'fees': 0.001,  # 0.1% fee
+            'fees': TRADE_FEE_RATE,
         }
         
         return TaskResult(
@@ -95,7 +109,7 @@ async def execute_stake_task(task: ExecutionTask) -> TaskResult:
     """Execute a staking task"""
     try:
         # Simulate staking execution
-        await asyncio.sleep(3)  # Simulate network delay
+        await asyncio.sleep(3 * EXECUTION_DELAY_SCALE)  # Simulate network delay
         
         result = {
             'validator': task.parameters.get('validator', 'default'),
@@ -125,7 +139,7 @@ async def execute_swap_task(task: ExecutionTask) -> TaskResult:
     """Execute a token swap task"""
     try:
         # Simulate swap execution
-        await asyncio.sleep(2.5)  # Simulate network delay
+        await asyncio.sleep(2.5 * EXECUTION_DELAY_SCALE)  # Simulate network delay
         
         result = {
             'from_token': task.parameters.get('from_token', 'USDC'),
@@ -155,6 +169,15 @@ async def execute_swap_task(task: ExecutionTask) -> TaskResult:
 
 async def execute_task(task: ExecutionTask) -> TaskResult:
     """Execute a task based on its type"""
+    start = time.perf_counter()
+    result = await _execute_task(task)
+    TASK_SECONDS.labels(task_type=task.task_type.value, status=result.status.value).observe(
+        time.perf_counter() - start
+    )
+    ACTIVE_TASK_COUNT.set(len(ACTIVE_TASKS))
+    return result
+
+async def _execute_task(task: ExecutionTask) -> TaskResult:
     # Update task status to in progress
     ACTIVE_TASKS[task.task_id] = task
     
@@ -206,24 +229,34 @@ async def execute_task(task: ExecutionTask) -> TaskResult:
         return result
 
 @executor_agent.on_message(model=ExecutionTask)
+@timed("ExecutionTask")
 async def handle_execution_task(ctx: Context, sender: str, msg: ExecutionTask):
-    """Handle task execution requests"""
+    """Admit a task to the queue, or reject it when over capacity"""
     try:
-        ctx.logger.info(f"Received execution task: {msg.task_type.value} from {sender}")
-        
-        # Add to queue
-        TASK_QUEUE.append(msg)
+        ctx.logger.info("Received execution task: %s from %s", msg.task_type.value, sender)
         
-        # Process task
-        result = await execute_task(msg)
+        # Behind the shard router every task has the same sender; share by user instead
+        client = msg.user_address if sender == EXECUTOR_ROUTER else sender
+        reason = ADMISSION.admit(client)
+        if reason is None:
+            # Fair across clients; one user's tasks still run one at a time, in order
+            reason = TASK_QUEUE.push(client, (sender, msg), msg.priority, key=msg.user_address)
+            if reason:
+                ADMISSION.reject(reason)
         
-        # Send result back to sender
-        await ctx.send(sender, result)
+        if reason:
+            await ctx.send(sender, TaskResult(
+                task_id=msg.task_id,
+                status=TaskStatus.REJECTED,
+                error=f"Rejected ({reason}); retry after {ADMISSION.retry_after:.2f}s",
+                timestamp=datetime.now().isoformat()
+            ))
+            return
         
-        ctx.logger.info(f"Completed task {msg.task_id}: {result.status.value}")
+        start_workers(ctx)
     
     except Exception as e:
-        ctx.logger.error(f"Error executing task {msg.task_id}: {e}")
+        ctx.logger.error(f"Error queueing task {msg.task_id}: {e}")
         
         error_result = TaskResult(
             task_id=msg.task_id,
@@ -234,21 +267,48 @@ async def handle_execution_task(ctx: Context, sender: str, msg: ExecutionTask):
         
         await ctx.send(sender, error_result)
 
+def start_workers(ctx: Context):
+    """Run queued tasks on up to MAX_CONCURRENT_TASKS workers"""
+    global WORKERS
+    while WORKERS < MAX_CONCURRENT_TASKS and TASK_QUEUE.ready():
+        WORKERS += 1
+        # Hand each new worker its first task so none starts with nothing to do
+        asyncio.create_task(task_worker(ctx, TASK_QUEUE.pop()))
+    QUEUE_DEPTH.set(len(TASK_QUEUE))
+
+async def task_worker(ctx: Context, job: tuple):
+    """Execute ``job`` and then further ready tasks until none is left
+
+    A user's tasks run one at a time, in the order they arrived; the
+    queue holds back their next task until this one is done.
+    """
+    global WORKERS
+    try:
+        while job:
+            client, user, (sender, task) = job
+            try:
+                result = await execute_task(task)
+                
+                try:
+                    await ctx.send(sender, result)
+                    ctx.logger.info("Completed task %s: %s", task.task_id, result.status.value)
+                except Exception as e:
+                    ctx.logger.error(f"Error sending result for task {task.task_id}: {e}")
+            finally:
+                TASK_QUEUE.done(client, user)
+            
+            job = TASK_QUEUE.pop() if TASK_QUEUE.ready() else None
+            QUEUE_DEPTH.set(len(TASK_QUEUE))
+    finally:
+        WORKERS -= 1
+
 @executor_agent.on_interval(period=5.0)
 async def process_queue(ctx: Context):
-    """Process pending tasks in the queue"""
-    if TASK_QUEUE:
-        # Process tasks in priority order
-        TASK_QUEUE.sort(key=lambda x: x.priority, reverse=True)
-        
-        # Process up to 3 tasks concurrently
-        tasks_to_process = TASK_QUEUE[:3]
-        TASK_QUEUE[:3] = []
-        
-        for task in tasks_to_process:
-            asyncio.create_task(execute_task(task))
+    """Restart workers for any tasks still waiting in the queue"""
+    start_workers(ctx)
 
 @executor_agent.on_message(model=TaskUpdate)
+@timed("TaskUpdate")
 async def handle_task_update_request(ctx: Context, sender: str, msg: TaskUpdate):
     """Handle task status update requests"""
     try:
@@ -282,6 +342,32 @@ async def handle_task_update_request(ctx: Context, sender: str, msg: TaskUpdate)
     except Exception as e:
         ctx.logger.error(f"Error handling task update request: {e}")
 
+@executor_agent.on_interval(period=5.0)
+async def send_shard_heartbeat(ctx: Context):
+    """Report liveness and load to the shard router"""
+    if not EXECUTOR_ROUTER:
+        return
+    
+    failed = sum(1 for r in TASK_HISTORY.values() if r.status == TaskStatus.FAILED)
+    heartbeat = ShardHeartbeat(
+        shard_id=executor_agent.name,
+        queue_depth=len(TASK_QUEUE),
+        active_tasks=len(ACTIVE_TASKS),
+        completed_tasks=len(TASK_HISTORY) - failed,
+        failed_tasks=failed,
+        timestamp=datetime.now().isoformat()
+    )
+    
+    try:
+        await ctx.send(EXECUTOR_ROUTER, heartbeat)
+    except Exception as e:
+        ctx.logger.error(f"Error sending shard heartbeat: {e}")
+
+@executor_agent.on_event("startup")
+async def start_metrics(ctx: Context):
+    """Expose /metrics when AGENTGRID_METRICS is set"""
+    await start_metrics_server(EXECUTOR_PORT)
+
 # Include the protocol
 executor_agent.include(executor_protocol, publish_manifest=True)
 
@@ -0,0 +1,273 @@
+from uagents import Context, Protocol
+from typing import Dict, List, Optional, Tuple
+import os
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+# Shared agent modules live one level up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.blueprint import AgentBlueprint
+from common.metrics import start_metrics_server, timed
+from common.models import (
+    ExecutionTask,
+    ExecutorStatus,
+    ExecutorStatusRequest,
+    ShardHeartbeat,
+    TaskResult,
+    TaskStatus,
+    TaskUpdate,
+)
+from common.ratelimit import AdmissionController
+from common.sharding import HashRing, ROUTER_NAME, ROUTER_PORT, ROUTER_SEED
+
+# Initialize the executor shard router
+router_agent = AgentBlueprint(
+    name=ROUTER_NAME,
+    seed=ROUTER_SEED,
+    port=ROUTER_PORT,
+    endpoint=[f"http://127.0.0.1:{ROUTER_PORT}/submit"]
+)
+
+router_protocol = Protocol("Executor Sharding")
+
+# Shards are dropped after missing heartbeats for this long
+SHARD_TIMEOUT = 20.0
+# Completed task -> shard mappings kept for status queries
+MAX_TASK_OWNERS = 100_000
+
+# Per-client admission; shards then share their capacity between users
+TASK_SENDER_RATE = 5.0  # tasks per second
+TASK_SENDER_BURST = 20
+TASK_GLOBAL_RATE = 200.0
+TASK_GLOBAL_BURST = 400
+ADMISSION = AdmissionController(
+    "ExecutionTask", TASK_SENDER_RATE, TASK_SENDER_BURST, TASK_GLOBAL_RATE, TASK_GLOBAL_BURST
+)
+
+# Status queries unanswered for this long are re-sent, then given up on
+STATUS_TIMEOUT = 10.0
+
+# Shard membership: address -> (last heartbeat monotonic time, last heartbeat);
+# static shards start with their registration time and no heartbeat
+SHARDS: Dict[str, Tuple[float, Optional[ShardHeartbeat]]] = {}
+RING = HashRing()
+
+# In-flight routing state
+PENDING_TASKS: Dict[str, Tuple[str, str, str]] = {}  # task_id -> (client, shard, user)
+USER_INFLIGHT: Dict[str, Tuple[str, int]] = {}  # user -> (shard, in-flight count)
+TASK_OWNERS: "OrderedDict[str, str]" = OrderedDict()  # task_id -> shard
+# task_id -> (shard queried, monotonic time of the query, clients awaiting a TaskUpdate)
+STATUS_WAITERS: Dict[str, Tuple[str, float, List[str]]] = {}
+
+def add_shard(ctx: Context, address: str):
+    if RING.add(address):
+        ctx.logger.info("Shard joined: %s (%d shards)", address, len(RING))
+
+def remove_shard(ctx: Context, address: str):
+    SHARDS.pop(address, None)
+    if RING.remove(address):
+        ctx.logger.info("Shard left: %s (%d shards)", address, len(RING))
+
+def route(user_address: str) -> str:
+    """Shard for a user, sticking to the current shard while tasks are in flight
+
+    Keeping in-flight users on their shard preserves per-user ordering when
+    the ring is rebalanced; the user moves once their queue has drained.
+    """
+    inflight = USER_INFLIGHT.get(user_address)
+    if inflight and inflight[0] in RING:
+        return inflight[0]
+    return RING.get(user_address)
+
+def remember_owner(task_id: str, shard: str):
+    TASK_OWNERS[task_id] = shard
+    TASK_OWNERS.move_to_end(task_id)
+    while len(TASK_OWNERS) > MAX_TASK_OWNERS:
+        TASK_OWNERS.popitem(last=False)
+
+def finish_task(task_id: str):
+    """Drop in-flight bookkeeping; returns the client that submitted the task"""
+    client, shard, user = PENDING_TASKS.pop(task_id)
+    inflight_shard, count = USER_INFLIGHT.get(user, (shard, 1))
+    if count <= 1:
+        USER_INFLIGHT.pop(user, None)
+    else:
+        USER_INFLIGHT[user] = (inflight_shard, count - 1)
+    return client
+
+@router_agent.on_message(model=ExecutionTask)
+@timed("ExecutionTask")
+async def handle_execution_task(ctx: Context, sender: str, msg: ExecutionTask):
+    """Forward a task to the shard that owns its user"""
+    reason = ADMISSION.admit(sender)
+    if reason:
+        await ctx.send(sender, TaskResult(
+            task_id=msg.task_id,
+            status=TaskStatus.REJECTED,
+            error=f"Rejected ({reason}); retry after {ADMISSION.retry_after:.2f}s",
+            timestamp=datetime.now().isoformat()
+        ))
+        return
+
+    if msg.task_id in PENDING_TASKS:
+        await ctx.send(sender, TaskResult(
+            task_id=msg.task_id,
+            status=TaskStatus.REJECTED,
+            error=f"Task {msg.task_id} is already in flight",
+            timestamp=datetime.now().isoformat()
+        ))
+        return
+
+    shard = route(msg.user_address)
+    if shard is None:
+        await ctx.send(sender, TaskResult(
+            task_id=msg.task_id,
+            status=TaskStatus.FAILED,
+            error="No executor shards available",
+            timestamp=datetime.now().isoformat()
+        ))
+        return
+
+    PENDING_TASKS[msg.task_id] = (sender, shard, msg.user_address)
+    _, count = USER_INFLIGHT.get(msg.user_address, (shard, 0))
+    USER_INFLIGHT[msg.user_address] = (shard, count + 1)
+    remember_owner(msg.task_id, shard)
+
+    await ctx.send(shard, msg)
+
+@router_agent.on_message(model=TaskResult)
+@timed("TaskResult")
+async def handle_task_result(ctx: Context, sender: str, msg: TaskResult):
+    """Relay a shard's result back to the original client"""
+    if msg.task_id not in PENDING_TASKS:
+        ctx.logger.warning(f"Result for unknown task {msg.task_id} from {sender}")
+        return
+
+    client = finish_task(msg.task_id)
+    await ctx.send(client, msg)
+
+@router_agent.on_message(model=TaskUpdate)
+@timed("TaskUpdate")
+async def handle_task_update(ctx: Context, sender: str, msg: TaskUpdate):
+    """Route status queries to the owning shard and relay its answer"""
+    if sender in SHARDS or sender in RING:
+        _, _, clients = STATUS_WAITERS.pop(msg.task_id, (None, 0.0, []))
+        for client in clients:
+            await ctx.send(client, msg)
+        return
+
+    shard = TASK_OWNERS.get(msg.task_id)
+    if shard is None or shard not in RING:
+        await ctx.send(sender, TaskUpdate(
+            task_id=msg.task_id,
+            status=TaskStatus.PENDING,
+            progress=0.0,
+            message=f"Task {msg.task_id} not found",
+            timestamp=datetime.now().isoformat()
+        ))
+        return
+
+    now = time.monotonic()
+    queried, sent_at, clients = STATUS_WAITERS.get(msg.task_id, (None, 0.0, []))
+    clients.append(sender)
+    # Only one query per task needs to reach the shard, unless it went unanswered
+    if queried != shard or now - sent_at > STATUS_TIMEOUT:
+        STATUS_WAITERS[msg.task_id] = (shard, now, clients)
+        await ctx.send(shard, msg)
+    else:
+        STATUS_WAITERS[msg.task_id] = (queried, sent_at, clients)
+
+async def release_waiters(ctx: Context, task_id: str, reason: str):
+    """Answer clients whose status query the owning shard will not answer"""
+    _, _, clients = STATUS_WAITERS.pop(task_id, (None, 0.0, []))
+    for client in clients:
+        await ctx.send(client, TaskUpdate(
+            task_id=task_id,
+            status=TaskStatus.PENDING,
+            progress=0.0,
+            message=f"Task {task_id} status unavailable: {reason}",
+            timestamp=datetime.now().isoformat()
+        ))
+
+@router_agent.on_message(model=ShardHeartbeat)
+async def handle_shard_heartbeat(ctx: Context, sender: str, msg: ShardHeartbeat):
+    """Register shards as they join and track their load"""
+    SHARDS[sender] = (time.monotonic(), msg)
+    add_shard(ctx, sender)
+
+@router_agent.on_message(model=ExecutorStatusRequest, replies=ExecutorStatus)
+async def handle_status_request(ctx: Context, sender: str, msg: ExecutorStatusRequest):
+    """Aggregate the latest heartbeat from every live shard"""
+    shards = {
+        heartbeat.shard_id: {
+            'queue_depth': heartbeat.queue_depth,
+            'active_tasks': heartbeat.active_tasks,
+            'completed_tasks': heartbeat.completed_tasks,
+            'failed_tasks': heartbeat.failed_tasks,
+        }
+        for _, heartbeat in SHARDS.values()
+        if heartbeat is not None
+    }
+
+    await ctx.send(sender, ExecutorStatus(
+        request_id=msg.request_id,
+        shards=shards,
+        queue_depth=sum(s['queue_depth'] for s in shards.values()),
+        active_tasks=sum(s['active_tasks'] for s in shards.values()),
+        completed_tasks=sum(s['completed_tasks'] for s in shards.values()),
+        failed_tasks=sum(s['failed_tasks'] for s in shards.values()),
+        timestamp=datetime.now().isoformat()
+    ))
+
+@router_agent.on_interval(period=5.0)
+async def expire_shards(ctx: Context):
+    """Drop shards whose heartbeats stopped, rebalancing the ring"""
+    now = time.monotonic()
+    expired = [a for a, (seen, _) in SHARDS.items() if now - seen > SHARD_TIMEOUT]
+    for address in expired:
+        remove_shard(ctx, address)
+
+    # Tasks stranded on a dead shard are failed back to their clients
+    stranded = [task_id for task_id, (_, shard, _) in PENDING_TASKS.items() if shard in expired]
+    for task_id in stranded:
+        client = finish_task(task_id)
+        await ctx.send(client, TaskResult(
+            task_id=task_id,
+            status=TaskStatus.FAILED,
+            error="Executor shard became unavailable",
+            timestamp=datetime.now().isoformat()
+        ))
+
+    # Status queries stuck on a dead shard, or never answered, are released
+    for task_id, (shard, sent_at, _) in list(STATUS_WAITERS.items()):
+        if shard in expired or shard not in RING:
+            await release_waiters(ctx, task_id, "executor shard became unavailable")
+        elif now - sent_at > 2 * STATUS_TIMEOUT:
+            await release_waiters(ctx, task_id, "executor shard did not respond")
+
+@router_agent.on_event("startup")
+async def add_static_shards(ctx: Context):
+    """Register shards listed in EXECUTOR_SHARDS, before their first heartbeat
+
+    They expire like any other shard if no heartbeat follows within
+    SHARD_TIMEOUT.
+    """
+    for address in filter(None, os.environ.get("EXECUTOR_SHARDS", "").split(",")):
+        address = address.strip()
+        SHARDS.setdefault(address, (time.monotonic(), None))
+        add_shard(ctx, address)
+
+@router_agent.on_event("startup")
+async def start_metrics(ctx: Context):
+    """Expose /metrics when AGENTGRID_METRICS is set"""
+    await start_metrics_server(ROUTER_PORT)
+
+# Include the protocol
+router_agent.include(router_protocol, publish_manifest=True)
+
+if __name__ == "__main__":
+    router_agent.run()
@@ -1,140 +1,87 @@
-# Mock implementation for development
-# In production, this would use the actual uagents package
-from typing import List, Dict, Optional
+from uagents import Context, Protocol
+from typing import List, Dict, Optional, Any
 import asyncio
 import json
-import numpy as np
+import sys
 from datetime import datetime
+from pathlib import Path
 
-class PortfolioRequest(Model):
-    user_address: str
-    risk_level: str  # 'low', 'medium', 'high'
-    amount: float
-    preferences: Optional[Dict[str, any]] = None
+# Shared agent modules live one level up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-class PortfolioResponse(Model):
-    allocations: Dict[str, float]
-    expected_return: float
-    risk_score: float
-    recommendations: List[str]
-    timestamp: str
+from common import metrics
+from common.blueprint import AgentBlueprint
+from common.metrics import LogSampler, start_metrics_server, timed
+from common.models import CompactFrame, PortfolioRequest, PortfolioResponse, PriceUpdate, RequestRejected, WireHello
+from common.portfolio import CRYPTO_ASSETS, calculate_portfolio_metrics, generate_recommendations, optimize_portfolio
+from common.ratelimit import AdmissionController
+from common.snapshot import SNAPSHOT_PERIOD, SNAPSHOTS_ENABLED, Snapshotter
+from common.wire import WireNegotiator, unpack_messages
 
-class PriceUpdate(Model):
-    symbol: str
-    price: float
-    timestamp: str
+PORTFOLIO_MANAGER_PORT = 8001
 
 # Initialize the portfolio manager agent
-portfolio_agent = Agent(
+portfolio_agent = AgentBlueprint(
     name="portfolio_manager",
     seed="portfolio_manager_seed_phrase_12345",
-    port=8001,
-    endpoint=["http://127.0.0.1:8001/submit"]
+    port=PORTFOLIO_MANAGER_PORT,
+    endpoint=[f"http://127.0.0.1:{PORTFOLIO_MANAGER_PORT}/submit"]
 )
 
 portfolio_protocol = Protocol("Portfolio Management")
 
-# Mock data for demonstration
-CRYPTO_ASSETS = {
-    'BTC': {'price': 45000, 'volatility': 0.8, 'correlation': 0.1},
-    'ETH': {'price': 3000, 'volatility': 0.9, 'correlation': 0.3},
-    'SOL': {'price': 100, 'volatility': 1.2, 'correlation': 0.5},
-    'AVAX': {'price': 25, 'volatility': 1.1, 'correlation': 0.4},
-    'MATIC': {'price': 0.8, 'volatility': 0.7, 'correlation': 0.6},
-    'USDC': {'price': 1.0, 'volatility': 0.01, 'correlation': 0.0},
-    'USDT': {'price': 1.0, 'volatility': 0.01, 'correlation': 0.0},
-}
-
-def calculate_portfolio_metrics(allocations: Dict[str, float]) -> tuple[float, float]:
-    """Calculate expected return and risk score for given allocations"""
-    total_return = 0
-    total_risk = 0
-    
-    for asset, weight in allocations.items():
-        if asset in CRYPTO_ASSETS:
-            asset_data = CRYPTO_ASSETS[asset]
-            # Simple expected return calculation (mock)
-            expected_return = 0.1 if asset not in ['USDC', 'USDT'] else 0.02
-            total_return += weight * expected_return
-            total_risk += weight * asset_data['volatility']
-    
-    return total_return, total_risk
+# Codec negotiated with each peer (JSON until a WireHello says otherwise)
+WIRE = WireNegotiator(portfolio_agent.name)
 
-def optimize_portfolio(risk_level: str, amount: float) -> Dict[str, float]:
-    """Optimize portfolio based on risk level using modern portfolio theory"""
-    
-    if risk_level == 'low':
-        # Conservative portfolio
-        return {
-            'USDC': 0.4,
-            'USDT': 0.3,
-            'BTC': 0.2,
-            'ETH': 0.1
-        }
-    elif risk_level == 'medium':
-        # Balanced portfolio
-        return {
-            'BTC': 0.3,
-            'ETH': 0.25,
-            'SOL': 0.15,
-            'AVAX': 0.1,
-            'MATIC': 0.1,
-            'USDC': 0.1
-        }
-    else:  # high risk
-        # Aggressive portfolio
-        return {
-            'BTC': 0.25,
-            'ETH': 0.2,
-            'SOL': 0.2,
-            'AVAX': 0.15,
-            'MATIC': 0.15,
-            'USDC': 0.05
-        }
-
-def generate_recommendations(allocations: Dict[str, float], risk_level: str) -> List[str]:
-    """Generate investment recommendations based on portfolio"""
-    recommendations = []
-    
-    if risk_level == 'low':
-        recommendations.extend([
-            "Consider dollar-cost averaging for stable growth",
-            "Monitor market conditions monthly",
-            "Rebalance quarterly to maintain target allocation"
-        ])
-    elif risk_level == 'medium':
-        recommendations.extend([
-            "Diversify across different sectors",
-            "Consider staking rewards for passive income",
-            "Monitor weekly and rebalance monthly"
-        ])
-    else:
-        recommendations.extend([
-            "High volatility expected - prepare for swings",
-            "Consider stop-loss strategies",
-            "Monitor daily and be ready to adjust quickly"
-        ])
-    
-    # Add specific recommendations based on allocations
-    if allocations.get('BTC', 0) > 0.3:
-        recommendations.append("High BTC allocation - consider reducing if overexposed")
-    
-    if allocations.get('USDC', 0) + allocations.get('USDT', 0) < 0.1:
-        recommendations.append("Low stablecoin allocation - consider adding more for stability")
-    
-    return recommendations
+# Value-at-risk engine fed by live price updates
+VAR_CONFIDENCE = 0.95
+RISK_ENGINE = None
+
+def get_risk_engine():
+    """Risk engine, built on first use so numpy loads lazily"""
+    global RISK_ENGINE
+    if RISK_ENGINE is None:
+        from common.risk import RiskEngine
+        RISK_ENGINE = RiskEngine(CRYPTO_ASSETS)
+    return RISK_ENGINE
 
-@portfolio_agent.on_message(model=PortfolioRequest, replies=PortfolioResponse)
+# Admission control: optimization with VaR is the most expensive request
+PORTFOLIO_SENDER_RATE = 2.0  # requests per second
+PORTFOLIO_SENDER_BURST = 10
+PORTFOLIO_GLOBAL_RATE = 50.0
+PORTFOLIO_GLOBAL_BURST = 100
+ADMISSION = AdmissionController(
+    "PortfolioRequest", PORTFOLIO_SENDER_RATE, PORTFOLIO_SENDER_BURST, PORTFOLIO_GLOBAL_RATE, PORTFOLIO_GLOBAL_BURST
+)
+
+# Instrumentation
+VAR_SECONDS = metrics.histogram("portfolio_var_seconds", "Value-at-risk computation time")
+PRICE_LOG = LogSampler()
+
+@portfolio_agent.on_message(model=PortfolioRequest, replies={PortfolioResponse, RequestRejected})
+@timed("PortfolioRequest")
 async def handle_portfolio_request(ctx: Context, sender: str, msg: PortfolioRequest):
     """Handle portfolio optimization requests"""
+    reason = ADMISSION.admit(sender)
+    if reason:
+        await ctx.send(sender, RequestRejected(
+            request=PortfolioRequest.__name__,
+            reason=reason,
+            retry_after=ADMISSION.retry_after,
+            timestamp=datetime.now().isoformat()
+        ))
+        return
+    
     try:
-        ctx.logger.info(f"Received portfolio request from {sender}: {msg.risk_level} risk, ${msg.amount}")
+        ctx.logger.info("Received portfolio request from %s: %s risk, $%s", sender, msg.risk_level, msg.amount)
         
         # Optimize portfolio based on risk level
         allocations = optimize_portfolio(msg.risk_level, msg.amount)
         
         # Calculate metrics
         expected_return, risk_score = calculate_portfolio_metrics(allocations)
+        with VAR_SECONDS.time():
+            var_95, cvar_95 = get_risk_engine().value_at_risk(allocations, msg.amount, VAR_CONFIDENCE)
         
         # Generate recommendations
         recommendations = generate_recommendations(allocations, msg.risk_level)
@@ -145,11 +92,13 @@ async def handle_portfolio_request(ctx: Context, sender: str, msg: PortfolioRequ
             expected_return=expected_return,
             risk_score=risk_score,
             recommendations=recommendations,
-            timestamp=datetime.now().isoformat()
+            timestamp=datetime.now().isoformat(),
+            var_95=var_95,
+            cvar_95=cvar_95
         )
         
         await ctx.send(sender, response)
-        ctx.logger.info(f"Sent portfolio response to {sender}")
+        ctx.logger.info("Sent portfolio response to %s", sender)
         
     except Exception as e:
         ctx.logger.error(f"Error handling portfolio request: {e}")
@@ -163,16 +112,91 @@ async def handle_portfolio_request(ctx: Context, sender: str, msg: PortfolioRequ
         )
         await ctx.send(sender, error_response)
 
+def apply_price_update(ctx: Context, msg: PriceUpdate):
+    """Store a live price and feed it to the risk engine"""
+    if msg.symbol in CRYPTO_ASSETS:
+        CRYPTO_ASSETS[msg.symbol]['price'] = msg.price
+        get_risk_engine().update_price(msg.symbol, msg.price)
+        if PRICE_LOG.ready():
+            ctx.logger.info("Updated %s price to $%s", msg.symbol, msg.price)
+
 @portfolio_agent.on_message(model=PriceUpdate)
+@timed("PriceUpdate")
 async def handle_price_update(ctx: Context, sender: str, msg: PriceUpdate):
     """Handle price updates from price monitor agent"""
     try:
-        if msg.symbol in CRYPTO_ASSETS:
-            CRYPTO_ASSETS[msg.symbol]['price'] = msg.price
-            ctx.logger.info(f"Updated {msg.symbol} price to ${msg.price}")
+        apply_price_update(ctx, msg)
     except Exception as e:
         ctx.logger.error(f"Error updating price for {msg.symbol}: {e}")
 
+@portfolio_agent.on_message(model=CompactFrame)
+@timed("CompactFrame")
+async def handle_compact_frame(ctx: Context, sender: str, msg: CompactFrame):
+    """Handle batched messages sent with a negotiated wire codec"""
+    try:
+        if msg.model != PriceUpdate.__name__:
+            ctx.logger.warning(f"Unsupported frame model {msg.model} from {sender}")
+            return
+        for update in unpack_messages(msg, PriceUpdate):
+            apply_price_update(ctx, update)
+    except Exception as e:
+        ctx.logger.error(f"Error decoding {msg.codec} frame from {sender}: {e}")
+
+@portfolio_agent.on_message(model=WireHello)
+async def handle_wire_hello(ctx: Context, sender: str, msg: WireHello):
+    """Record a peer's codecs and answer with ours if it asked"""
+    if WIRE.on_hello(sender, msg):
+        await ctx.send(sender, WIRE.hello(reply=False))
+
+@portfolio_agent.on_event("startup")
+async def start_metrics(ctx: Context):
+    """Expose /metrics when AGENTGRID_METRICS is set"""
+    await start_metrics_server(PORTFOLIO_MANAGER_PORT)
+
+# Warm restart: live prices and the VaR price history survive a restart
+SNAPSHOT = Snapshotter(portfolio_agent.name, schema=1)
+
+def snapshot_state() -> Dict:
+    return {
+        'prices': {symbol: asset['price'] for symbol, asset in CRYPTO_ASSETS.items()},
+        'history': RISK_ENGINE.history_snapshot() if RISK_ENGINE else {},
+    }
+
+def restore_state(state: Dict):
+    for symbol, price in state.get('prices', {}).items():
+        if symbol in CRYPTO_ASSETS:
+            CRYPTO_ASSETS[symbol]['price'] = price
+    if state.get('history'):
+        get_risk_engine().restore_history(state['history'])
+
+@portfolio_agent.on_event("startup")
+async def restore_snapshot(ctx: Context):
+    """Answer with the last known prices before the first price update"""
+    if not SNAPSHOTS_ENABLED:
+        return
+    try:
+        state = SNAPSHOT.load()
+        if state:
+            restore_state(state)
+            ctx.logger.info("Restored %d prices from %s", len(state.get('prices', {})), SNAPSHOT.path)
+    except Exception as e:
+        ctx.logger.error(f"Ignoring unreadable snapshot {SNAPSHOT.path}: {e}")
+
+@portfolio_agent.on_interval(period=SNAPSHOT_PERIOD)
+async def save_snapshot(ctx: Context):
+    """Periodically persist live prices and price history"""
+    if not SNAPSHOTS_ENABLED:
+        return
+    try:
+        SNAPSHOT.save(snapshot_state())
+    except Exception as e:
+        ctx.logger.error(f"Error saving snapshot: {e}")
+
+@portfolio_agent.on_event("shutdown")
+async def save_final_snapshot(ctx: Context):
+    """Persist the latest state on a clean shutdown"""
+    await save_snapshot(ctx)
+
 # Include the protocol
 portfolio_agent.include(portfolio_protocol, publish_manifest=True)
 
@@ -1,81 +1,133 @@
-from uagents import Agent, Context, Model, Protocol
+from uagents import Context, Protocol
 from typing import List, Dict, Optional
 import asyncio
 import json
-import aiohttp
+import os
+import sys
 from datetime import datetime, timedelta
+from pathlib import Path
 
-class PriceAlert(Model):
-    symbol: str
-    target_price: float
-    condition: str  # 'above', 'below', 'change'
-    user_address: str
-    alert_id: str
-
-class PriceUpdate(Model):
-    symbol: str
-    price: float
-    timestamp: str
-    change_24h: float
-    volume_24h: float
-
-class PriceData(Model):
-    symbol: str
-    price: float
-    change_24h: float
-    volume_24h: float
-    market_cap: float
-    timestamp: str
+# Shared agent modules live one level up
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import metrics
+from common.blueprint import AgentBlueprint
+from common.metrics import LogSampler, start_metrics_server, timed
+from common.models import PriceAlert, PriceAlertTriggered, PriceData, PriceUpdate, RequestRejected, WireHello
+from common.ratelimit import CAPACITY, NOT_OWNER, SENDER_LIMIT, AdmissionController
+from common.snapshot import SNAPSHOT_PERIOD, SNAPSHOTS_ENABLED, Snapshotter
+from common.wire import WireNegotiator, pack_messages
+
+PRICE_MONITOR_PORT = 8002
 
 # Initialize the price monitor agent
-price_agent = Agent(
+price_agent = AgentBlueprint(
     name="price_monitor",
     seed="price_monitor_seed_phrase_12345",
-    port=8002,
-    endpoint=["http://127.0.0.1:8002/submit"]
+    port=PRICE_MONITOR_PORT,
+    endpoint=[f"http://127.0.0.1:{PRICE_MONITOR_PORT}/submit"]
 )
 
 price_protocol = Protocol("Price Monitoring")
 
+# Codec negotiated with each peer (JSON until a WireHello says otherwise)
+WIRE = WireNegotiator(price_agent.name)
+
+# Instrumentation
+PRICE_CYCLE_SECONDS = metrics.histogram("price_cycle_seconds", "Duration of a full price update cycle")
+ALERT_CHECK_SECONDS = metrics.histogram("price_alert_check_seconds", "Alert evaluation time per symbol")
+ACTIVE_ALERTS = metrics.gauge("price_alerts_active", "Registered price alerts")
+PRICE_LOG = LogSampler()
+
 # Tracked symbols and their current data
 TRACKED_SYMBOLS = ['BTC', 'ETH', 'SOL', 'AVAX', 'MATIC', 'USDC', 'USDT']
 PRICE_DATA = {}
 ALERTS = {}
+ALERTS_PER_SENDER: Dict[str, int] = {}
 
-# Mock price data for demonstration
+# Admission control for alert registrations
+ALERT_SENDER_RATE = 5.0  # registrations per second
+ALERT_SENDER_BURST = 20
+ALERT_GLOBAL_RATE = 200.0
+ALERT_GLOBAL_BURST = 500
+MAX_ALERTS_PER_SENDER = 100
+MAX_ALERTS = 10_000
+ADMISSION = AdmissionController(
+    "PriceAlert", ALERT_SENDER_RATE, ALERT_SENDER_BURST, ALERT_GLOBAL_RATE, ALERT_GLOBAL_BURST
+)
+
+# Mock price data for demonstration (volatility is annualized; correlation
+# is the loading on a common market factor, as in the portfolio manager)
 MOCK_PRICES = {
-    'BTC': {'price': 45000, 'change_24h': 2.5, 'volume_24h': 25000000000},
-    'ETH': {'price': 3000, 'change_24h': 3.2, 'volume_24h': 15000000000},
-    'SOL': {'price': 100, 'change_24h': -1.8, 'volume_24h': 2000000000},
-    'AVAX': {'price': 25, 'change_24h': 5.1, 'volume_24h': 800000000},
-    'MATIC': {'price': 0.8, 'change_24h': 1.2, 'volume_24h': 500000000},
-    'USDC': {'price': 1.0, 'change_24h': 0.0, 'volume_24h': 1000000000},
-    'USDT': {'price': 1.0, 'change_24h': 0.0, 'volume_24h': 2000000000},
+    'BTC': {'price': 45000, 'change_24h': 2.5, 'volume_24h': 25000000000, 'volatility': 0.8, 'correlation': 0.1},
+    'ETH': {'price': 3000, 'change_24h': 3.2, 'volume_24h': 15000000000, 'volatility': 0.9, 'correlation': 0.3},
+    'SOL': {'price': 100, 'change_24h': -1.8, 'volume_24h': 2000000000, 'volatility': 1.2, 'correlation': 0.5},
+    'AVAX': {'price': 25, 'change_24h': 5.1, 'volume_24h': 800000000, 'volatility': 1.1, 'correlation': 0.4},
+    'MATIC': {'price': 0.8, 'change_24h': 1.2, 'volume_24h': 500000000, 'volatility': 0.7, 'correlation': 0.6},
+    'USDC': {'price': 1.0, 'change_24h': 0.0, 'volume_24h': 1000000000, 'volatility': 0.01, 'correlation': 0.0},
+    'USDT': {'price': 1.0, 'change_24h': 0.0, 'volume_24h': 2000000000, 'volatility': 0.01, 'correlation': 0.0},
 }
 
-async def fetch_price_data(symbol: str) -> Optional[Dict]:
-    """Fetch real-time price data for a symbol"""
+PRICE_UPDATE_PERIOD = 30.0
+HELLO_RETRY_PERIOD = 10.0
+
+# Offline price source; set PRICE_SIM_SEED for a reproducible price path
+PRICE_SIM_SEED = os.environ.get("PRICE_SIM_SEED")
+SIMULATOR = None
+
+def get_simulator():
+    """Price simulator, built on the first price cycle so numpy loads lazily"""
+    global SIMULATOR
+    if SIMULATOR is None:
+        from common.simulator import PriceSimulator
+        SIMULATOR = PriceSimulator.from_assets(
+            MOCK_PRICES,
+            tick_seconds=PRICE_UPDATE_PERIOD,
+            seed=int(PRICE_SIM_SEED) if PRICE_SIM_SEED else None,
+        )
+    return SIMULATOR
+
+async def fetch_price_data() -> Dict[str, Dict]:
+    """Fetch price data for every tracked symbol in one step"""
     try:
         # In production, this would use a real API like CoinGecko, CoinMarketCap, etc.
-        # For demo purposes, we'll use mock data with some randomness
-        if symbol in MOCK_PRICES:
-            base_data = MOCK_PRICES[symbol].copy()
-            # Add some randomness to simulate price movement
-            import random
-            price_change = random.uniform(-0.05, 0.05)  # ±5% random change
-            base_data['price'] *= (1 + price_change)
-            base_data['change_24h'] += random.uniform(-2, 2)
-            return base_data
-        return None
+        # For demo purposes, we advance the simulator by one tick
+        simulator = get_simulator()
+        simulator.step()
+        return simulator.snapshot()
     except Exception as e:
-        print(f"Error fetching price for {symbol}: {e}")
-        return None
+        print(f"Error fetching prices: {e}")
+        return {}
 
-async def check_alerts(symbol: str, current_price: float):
-    """Check if any alerts should be triggered for this symbol"""
+async def check_alerts(symbol: str, current_price: float) -> List[tuple]:
+    """Check alerts for this symbol; returns (recipient, notification) pairs"""
     if symbol not in ALERTS:
-        return
+        return []
+    
+    with ALERT_CHECK_SECONDS.time():
+        triggered = _evaluate_alerts(symbol, current_price)
     
+    # Remove triggered alerts
+    notifications = []
+    for alert_id in triggered:
+        alert = ALERTS[symbol].pop(alert_id)
+        if not ALERTS[symbol]:
+            del ALERTS[symbol]
+        release_alert(alert.get('notify'))
+        notifications.append((alert.get('notify'), PriceAlertTriggered(
+            alert_id=alert_id,
+            symbol=symbol,
+            condition=alert['condition'],
+            target_price=alert['target_price'],
+            price=current_price,
+            user_address=alert['user_address'],
+            timestamp=datetime.now().isoformat()
+        )))
+    ACTIVE_ALERTS.set(alert_count())
+    return notifications
+
+def _evaluate_alerts(symbol: str, current_price: float) -> List[str]:
+    """IDs of this symbol's alerts whose condition holds at ``current_price``"""
     triggered_alerts = []
     for alert_id, alert in ALERTS[symbol].items():
         should_trigger = False
@@ -92,18 +144,20 @@ async def check_alerts(symbol: str, current_price: float):
         if should_trigger:
             triggered_alerts.append(alert_id)
     
-    # Remove triggered alerts
-    for alert_id in triggered_alerts:
-        del ALERTS[symbol][alert_id]
-        if not ALERTS[symbol]:
-            del ALERTS[symbol]
+    return triggered_alerts
 
-@price_agent.on_interval(period=30.0)  # Update every 30 seconds
+@price_agent.on_interval(period=PRICE_UPDATE_PERIOD)  # Update every 30 seconds
 async def update_prices(ctx: Context):
     """Periodically update price data for all tracked symbols"""
+    with PRICE_CYCLE_SECONDS.time():
+        await _update_prices(ctx)
+
+async def _update_prices(ctx: Context):
     try:
+        price_updates = []
+        prices = await fetch_price_data()
         for symbol in TRACKED_SYMBOLS:
-            price_data = await fetch_price_data(symbol)
+            price_data = prices.get(symbol)
             if price_data:
                 PRICE_DATA[symbol] = {
                     'symbol': symbol,
@@ -114,8 +168,10 @@ async def update_prices(ctx: Context):
                     'timestamp': datetime.now().isoformat()
                 }
                 
-                # Check for alerts
-                await check_alerts(symbol, price_data['price'])
+                # Check for alerts and notify whoever registered them
+                for recipient, notification in await check_alerts(symbol, price_data['price']):
+                    if recipient:
+                        await ctx.send(recipient, notification)
                 
                 # Broadcast price update to other agents
                 price_update = PriceUpdate(
@@ -126,34 +182,91 @@ async def update_prices(ctx: Context):
                     volume_24h=price_data['volume_24h']
                 )
                 
-                # Send to portfolio manager
-                await ctx.send("portfolio_manager", price_update)
+                price_updates.append(price_update)
                 
-                ctx.logger.info(f"Updated {symbol}: ${price_data['price']:.2f} ({price_data['change_24h']:+.2f}%)")
+                if PRICE_LOG.ready():
+                    ctx.logger.info("Updated %s: $%.2f (%+.2f%%)", symbol, price_data['price'], price_data['change_24h'])
+        
+        # Send to portfolio manager, as one frame if it negotiated a codec
+        codec = WIRE.codec_for("portfolio_manager")
+        if codec and price_updates:
+            await ctx.send("portfolio_manager", pack_messages(price_updates, codec))
+        else:
+            for price_update in price_updates:
+                await ctx.send("portfolio_manager", price_update)
     
     except Exception as e:
         ctx.logger.error(f"Error updating prices: {e}")
 
+def alert_count() -> int:
+    return sum(len(alerts) for alerts in ALERTS.values())
+
+def release_alert(sender: Optional[str]):
+    """Free one of a sender's alert slots"""
+    remaining = ALERTS_PER_SENDER.get(sender, 0) - 1
+    if remaining > 0:
+        ALERTS_PER_SENDER[sender] = remaining
+    else:
+        ALERTS_PER_SENDER.pop(sender, None)
+
+def admit_alert(sender: str, msg: PriceAlert) -> Optional[str]:
+    """Rejection reason for an alert, or None if it may be registered
+
+    Replacing an alert is charged like creating one, and only the sender
+    that registered an alert may replace it.
+    """
+    previous = ALERTS.get(msg.symbol, {}).get(msg.alert_id)
+    if previous and previous.get('notify') != sender:
+        return ADMISSION.reject(NOT_OWNER)
+    reason = ADMISSION.admit(sender)
+    if reason or previous:
+        return reason  # a replacement reuses the sender's existing slot
+    if ALERTS_PER_SENDER.get(sender, 0) >= MAX_ALERTS_PER_SENDER:
+        return ADMISSION.reject(SENDER_LIMIT)
+    if alert_count() >= MAX_ALERTS:
+        return ADMISSION.reject(CAPACITY)
+    return None
+
 @price_agent.on_message(model=PriceAlert)
+@timed("PriceAlert")
 async def handle_price_alert(ctx: Context, sender: str, msg: PriceAlert):
     """Handle price alert requests"""
     try:
+        reason = admit_alert(sender, msg)
+        if reason:
+            await ctx.send(sender, RequestRejected(
+                request=PriceAlert.__name__,
+                request_id=msg.alert_id,
+                reason=reason,
+                retry_after=ADMISSION.retry_after,
+                timestamp=datetime.now().isoformat()
+            ))
+            return
+        
         if msg.symbol not in ALERTS:
             ALERTS[msg.symbol] = {}
         
+        previous = ALERTS[msg.symbol].get(msg.alert_id)
+        if previous:
+            release_alert(previous.get('notify'))
+        ALERTS_PER_SENDER[sender] = ALERTS_PER_SENDER.get(sender, 0) + 1
+        
         ALERTS[msg.symbol][msg.alert_id] = {
             'target_price': msg.target_price,
             'condition': msg.condition,
             'user_address': msg.user_address,
+            'notify': sender,
             'created_at': datetime.now().isoformat()
         }
+        ACTIVE_ALERTS.set(alert_count())
         
-        ctx.logger.info(f"Created price alert for {msg.symbol}: {msg.condition} ${msg.target_price}")
+        ctx.logger.info("Created price alert for %s: %s $%s", msg.symbol, msg.condition, msg.target_price)
         
     except Exception as e:
         ctx.logger.error(f"Error creating price alert: {e}")
 
 @price_agent.on_message(model=PriceData)
+@timed("PriceData")
 async def handle_price_request(ctx: Context, sender: str, msg: PriceData):
     """Handle price data requests"""
     try:
@@ -175,6 +288,81 @@ async def handle_price_request(ctx: Context, sender: str, msg: PriceData):
     except Exception as e:
         ctx.logger.error(f"Error handling price request: {e}")
 
+@price_agent.on_event("startup")
+async def start_metrics(ctx: Context):
+    """Expose /metrics when AGENTGRID_METRICS is set"""
+    await start_metrics_server(PRICE_MONITOR_PORT)
+
+@price_agent.on_event("startup")
+async def announce_codecs(ctx: Context):
+    """Offer our wire codecs to the portfolio manager"""
+    await ctx.send("portfolio_manager", WIRE.hello())
+
+@price_agent.on_interval(period=HELLO_RETRY_PERIOD)
+async def retry_codecs(ctx: Context):
+    """Keep offering codecs until the portfolio manager answers, e.g. if it started later"""
+    if WIRE.codec_for("portfolio_manager") is None:
+        await ctx.send("portfolio_manager", WIRE.hello())
+
+@price_agent.on_message(model=WireHello)
+async def handle_wire_hello(ctx: Context, sender: str, msg: WireHello):
+    """Record a peer's codecs and answer with ours if it asked"""
+    if WIRE.on_hello(sender, msg):
+        await ctx.send(sender, WIRE.hello(reply=False))
+
+# Warm restart: prices and registered alerts survive a restart
+SNAPSHOT = Snapshotter(price_agent.name, schema=1)
+
+def snapshot_state() -> Dict:
+    return {'price_data': PRICE_DATA, 'alerts': ALERTS}
+
+def restore_state(state: Dict):
+    """Load snapshotted prices and alerts, and resume the price path from them"""
+    PRICE_DATA.update(state.get('price_data', {}))
+    for symbol, alerts in state.get('alerts', {}).items():
+        ALERTS.setdefault(symbol, {}).update(alerts)
+    
+    ALERTS_PER_SENDER.clear()
+    for alerts in ALERTS.values():
+        for alert in alerts.values():
+            sender = alert.get('notify')
+            ALERTS_PER_SENDER[sender] = ALERTS_PER_SENDER.get(sender, 0) + 1
+    ACTIVE_ALERTS.set(alert_count())
+    
+    # The simulator is built lazily, so seeding its start prices is enough
+    for symbol, price_data in PRICE_DATA.items():
+        if symbol in MOCK_PRICES:
+            MOCK_PRICES[symbol]['price'] = price_data['price']
+            MOCK_PRICES[symbol]['change_24h'] = price_data['change_24h']
+
+@price_agent.on_event("startup")
+async def restore_snapshot(ctx: Context):
+    """Serve the last known prices and alerts before the first price cycle"""
+    if not SNAPSHOTS_ENABLED:
+        return
+    try:
+        state = SNAPSHOT.load()
+        if state:
+            restore_state(state)
+            ctx.logger.info("Restored %d prices and %d alerts from %s", len(PRICE_DATA), alert_count(), SNAPSHOT.path)
+    except Exception as e:
+        ctx.logger.error(f"Ignoring unreadable snapshot {SNAPSHOT.path}: {e}")
+
+@price_agent.on_interval(period=SNAPSHOT_PERIOD)
+async def save_snapshot(ctx: Context):
+    """Periodically persist prices and alerts"""
+    if not SNAPSHOTS_ENABLED:
+        return
+    try:
+        SNAPSHOT.save(snapshot_state())
+    except Exception as e:
+        ctx.logger.error(f"Error saving snapshot: {e}")
+
+@price_agent.on_event("shutdown")
+async def save_final_snapshot(ctx: Context):
+    """Persist the latest state on a clean shutdown"""
+    await save_snapshot(ctx)
+
 # Include the protocol
 price_agent.include(price_protocol, publish_manifest=True)
 
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Script to backtest portfolio manager strategies over recorded price history
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add the agents directory to the Python path
+agents_dir = Path(__file__).parent.parent / "agents"
+sys.path.insert(0, str(agents_dir))
+
+from common.backtest import StrategyConfig, TRADE_FEE_RATE, load_price_history, run_grid
+from common.portfolio import CRYPTO_ASSETS
+from common.simulator import PriceSimulator
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60
+
+def parse_list(value, cast):
+    return [cast(v) for v in value.split(",") if v]
+
+def main():
+    """Run a grid of strategy/parameter combinations and print a summary"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("prices", type=Path, nargs="?", help="Recorded prices (.csv or .json)")
+    parser.add_argument("--simulate", type=int, metavar="TICKS", help="Backtest over simulated ticks instead")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for --simulate")
+    parser.add_argument("--risk-levels", default="low,medium,high")
+    parser.add_argument("--rebalance-every", default="0,120,2880", help="Ticks between rebalances")
+    parser.add_argument("--drift-thresholds", default="0.02,0.05,0.1")
+    parser.add_argument("--fee-rate", type=float, default=TRADE_FEE_RATE)
+    parser.add_argument("--capital", type=float, default=10_000.0)
+    parser.add_argument("--tick-seconds", type=float, default=30.0, help="Seconds between recorded ticks")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output", type=Path, help="Write summaries and equity curves as JSON")
+    args = parser.parse_args()
+
+    if args.simulate:
+        simulator = PriceSimulator.from_assets(CRYPTO_ASSETS, tick_seconds=args.tick_seconds, seed=args.seed)
+        symbols, prices = simulator.symbols, simulator.generate(args.simulate)
+    elif args.prices:
+        symbols, prices = load_price_history(args.prices)
+    else:
+        parser.error("give a prices file or --simulate TICKS")
+    configs = [
+        StrategyConfig(
+            risk_level=risk_level,
+            rebalance_every=every,
+            drift_threshold=drift,
+            fee_rate=args.fee_rate,
+            initial_capital=args.capital,
+        )
+        for risk_level, every, drift in itertools.product(
+            parse_list(args.risk_levels, str),
+            parse_list(args.rebalance_every, int),
+            parse_list(args.drift_thresholds, float),
+        )
+    ]
+
+    print(f"📈 Backtesting {len(configs)} strategies over {len(prices)} ticks of {', '.join(symbols)}")
+    print("=" * 50)
+
+    results = run_grid(
+        prices,
+        symbols,
+        configs,
+        periods_per_year=SECONDS_PER_YEAR / args.tick_seconds,
+        workers=args.workers,
+    )
+    results.sort(key=lambda r: r.sharpe_ratio, reverse=True)
+
+    print(f"{'risk':<7}{'every':>7}{'drift':>7}{'return':>10}{'sharpe':>9}{'max dd':>9}{'trades':>8}{'fees':>10}")
+    for r in results:
+        c = r.config
+        print(
+            f"{c.risk_level:<7}{c.rebalance_every:>7}{c.drift_threshold:>7.2f}"
+            f"{r.total_return:>+10.2%}{r.sharpe_ratio:>9.2f}{r.max_drawdown:>9.2%}"
+            f"{r.trades:>8}{r.fees_paid:>10.2f}"
+        )
+
+    if args.output:
+        payload = [
+            {**r.summary(), 'equity_curve': r.equity_curve.round(4).tolist()}
+            for r in results
+        ]
+        args.output.write_text(json.dumps(payload))
+        print(f"\n💾 Wrote results to {args.output}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
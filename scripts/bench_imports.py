@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Import-time regression benchmark for the agents, shared modules and launcher
+
+Each target is imported in a fresh interpreter under ``python -X importtime``.
+The best of ``--repeat`` runs is compared against the target's budget, and
+the target fails outright if it loads a module it should defer (numpy before
+the first VaR or price cycle, the uagents runtime from the message models).
+Exits non-zero on any regression so it can gate CI.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = ROOT / "scripts"
+AGENTS_DIR = ROOT / "agents"
+
+LOAD_AGENT = "from common.loader import load_agent_module; load_agent_module({!r})"
+
+# name, statement, import-time budget in ms, modules that must not be loaded
+TARGETS = [
+    ("common.models", "import common.models", 300, ("uagents", "numpy", "aiohttp")),
+    ("common.wire", "import common.wire", 350, ("uagents", "numpy", "aiohttp")),
+    ("common.metrics", "import common.metrics", 150, ("uagents", "uagents_core", "numpy")),
+    ("common.portfolio", "import common.portfolio", 50, ("uagents", "uagents_core", "numpy")),
+    ("launcher", "import start_agents", 200, ("uagents", "uagents_core", "numpy")),
+    ("portfolio_manager", LOAD_AGENT.format("portfolio_manager"), 2000, ("numpy",)),
+    ("price_monitor", LOAD_AGENT.format("price_monitor"), 2000, ("numpy",)),
+    ("executor", LOAD_AGENT.format("executor"), 2000, ("numpy",)),
+]
+
+def measure(statement: str, baseline: Set[str] = frozenset()) -> Tuple[float, Dict[str, float]]:
+    """Import time in ms and per-module cumulative times for one run
+
+    Top-level modules in ``baseline`` (interpreter startup) are left out of
+    the total.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(AGENTS_DIR), str(SCRIPTS_DIR)]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    total = 0.0
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level imports are unindented; their cumulative times add up to the total
+        if not name.startswith("  ") and name.strip() not in baseline:
+            total += int(cumulative) / 1000
+        modules[name.strip()] = int(cumulative) / 1000
+    return total, modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per target; the fastest is kept")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiplier on every budget, for slow machines")
+    parser.add_argument("--top", type=int, default=0, help="Show this many heaviest imports per target")
+    parser.add_argument("targets", nargs="*", help="Only benchmark these targets")
+    args = parser.parse_args()
+
+    targets = [t for t in TARGETS if not args.targets or t[0] in args.targets]
+    failures: List[str] = []
+    _, startup = measure("pass")
+
+    print(f"⏱️  Import time, best of {args.repeat} runs")
+    print("=" * 50)
+    for name, statement, budget, forbidden in targets:
+        try:
+            runs = [measure(statement, set(startup)) for _ in range(max(1, args.repeat))]
+        except RuntimeError as e:
+            print(f"  ❌ {name:<18} import failed: {e}")
+            failures.append(name)
+            continue
+
+        total, modules = min(runs, key=lambda run: run[0])
+        budget *= args.budget_scale
+        loaded = [module for module in forbidden if module in modules]
+        ok = total <= budget and not loaded
+        print(f"  {'✅' if ok else '❌'} {name:<18} {total:8.1f}ms  (budget {budget:.0f}ms)")
+        if loaded:
+            print(f"     loads deferred modules: {', '.join(loaded)}")
+        if not ok:
+            failures.append(name)
+
+        heaviest = sorted((item for item in modules.items() if item[0] not in startup), key=lambda item: -item[1])
+        for module, cumulative in heaviest[:args.top]:
+            print(f"     {cumulative:8.1f}ms  {module}")
+
+    print("=" * 50)
+    if failures:
+        print(f"⚠️  Import-time regressions: {', '.join(failures)}")
+        return 1
+    print("🎉 All imports within budget")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of JSON vs compact wire encoding for agent messages
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the agents directory to the Python path
+agents_dir = Path(__file__).parent.parent / "agents"
+sys.path.insert(0, str(agents_dir))
+
+from common.models import (
+    ExecutionTask,
+    PortfolioResponse,
+    PriceUpdate,
+    TaskResult,
+    TaskStatus,
+    TaskType,
+)
+from common.wire import CODEC_JSON, CODEC_MSGPACK, local_codecs, pack_messages, unpack_messages
+
+def sample_messages(count):
+    """Representative messages of each model, ``count`` of each"""
+    symbols = ["BTC", "ETH", "SOL", "AVAX", "MATIC", "USDC", "USDT"]
+    now = datetime.now().isoformat()
+
+    return {
+        "PriceUpdate": [
+            PriceUpdate(
+                symbol=symbols[i % len(symbols)],
+                price=45000.0 + i,
+                timestamp=now,
+                change_24h=2.5,
+                volume_24h=25000000000.0,
+            )
+            for i in range(count)
+        ],
+        "ExecutionTask": [
+            ExecutionTask(
+                task_id=f"task_{i}",
+                task_type=TaskType.TRADE,
+                user_address="0x1234567890123456789012345678901234567890",
+                parameters={"symbol": symbols[i % len(symbols)], "amount": 1.0, "side": "buy"},
+                priority=1,
+            )
+            for i in range(count)
+        ],
+        "TaskResult": [
+            TaskResult(
+                task_id=f"task_{i}",
+                status=TaskStatus.COMPLETED,
+                result={"symbol": "ETH", "amount": 1.0, "price": 3000.0, "fees": 0.001},
+                gas_used=21000,
+                transaction_hash="0x" + "ab" * 32,
+                timestamp=now,
+            )
+            for i in range(count)
+        ],
+        "PortfolioResponse": [
+            PortfolioResponse(
+                allocations={"BTC": 0.3, "ETH": 0.25, "SOL": 0.15, "AVAX": 0.1, "MATIC": 0.1, "USDC": 0.1},
+                expected_return=0.092,
+                risk_score=0.83,
+                recommendations=["Diversify across different sectors", "Monitor weekly and rebalance monthly"],
+                timestamp=now,
+                var_95=41.2,
+                cvar_95=52.7,
+            )
+            for i in range(count)
+        ],
+    }
+
+def bench_json(messages, repeat):
+    """Per-message JSON, as agents send today"""
+    model_cls = type(messages[0])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encoded = [m.json() for m in messages]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decoded = [model_cls.parse_raw(e) for e in encoded]
+    decode_time = time.perf_counter() - start
+
+    assert decoded == messages
+    return encode_time, decode_time, sum(len(e) for e in encoded)
+
+def bench_frame(messages, codec, batch, repeat):
+    """Batched frames with the given codec"""
+    model_cls = type(messages[0])
+    batches = [messages[i:i + batch] for i in range(0, len(messages), batch)]
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        frames = [pack_messages(b, codec) for b in batches]
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decoded = [m for f in frames for m in unpack_messages(f, model_cls)]
+    decode_time = time.perf_counter() - start
+
+    assert decoded == messages
+    return encode_time, decode_time, sum(len(f.json()) for f in frames)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=2000, help="Messages per model")
+    parser.add_argument("--batch", type=int, default=7, help="Messages per frame")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"📦 Wire format benchmark ({args.messages} msgs x {args.repeat}, batch {args.batch})")
+    print("=" * 78)
+    print(f"{'model':<18}{'codec':<16}{'enc msg/s':>12}{'dec msg/s':>12}{'bytes/msg':>11}")
+
+    total = args.messages * args.repeat
+    for name, messages in sample_messages(args.messages).items():
+        runs = [("json", bench_json(messages, args.repeat))]
+        runs.append((f"{CODEC_JSON} frame", bench_frame(messages, CODEC_JSON, args.batch, args.repeat)))
+        if CODEC_MSGPACK in local_codecs():
+            runs.append((f"{CODEC_MSGPACK} frame", bench_frame(messages, CODEC_MSGPACK, args.batch, args.repeat)))
+
+        for label, (enc, dec, size) in runs:
+            print(f"{name:<18}{label:<16}{total / enc:>12,.0f}{total / dec:>12,.0f}{size / len(messages):>11.1f}")
+
+    if CODEC_MSGPACK not in local_codecs():
+        print("\nℹ️  msgpack is not installed; only JSON codecs were measured")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Script to load test the price -> portfolio -> executor message flow offline
+
+All three agents run in one process on a simulated transport. Recorded (or
+simulated) price ticks are replayed through the price monitor at a chosen
+speed-up while a load client fires PortfolioRequest, PriceAlert and
+ExecutionTask messages. Every triggered alert is answered with a trade, so
+the report covers price tick -> alert and price tick -> trade latency.
+
+Requests are spread over ``--clients`` sender addresses, so the agents'
+per-sender rate limits apply as they would to real users; requests refused
+by admission control are counted per flow instead of timed.
+
+The executor's 5 s ``process_queue`` interval is not scheduled: it only
+restarts workers, which the message handler already starts.
+"""
+
+import argparse
+import asyncio
+import itertools
+import logging
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+# Add the agents directory to the Python path
+agents_dir = Path(__file__).parent.parent / "agents"
+sys.path.insert(0, str(agents_dir))
+
+from common.backtest import load_price_history
+from common.loader import load_agent_module
+from common.models import (
+    ExecutionTask,
+    PortfolioRequest,
+    PortfolioResponse,
+    PriceAlert,
+    PriceAlertTriggered,
+    RequestRejected,
+    TaskResult,
+    TaskStatus,
+    TaskType,
+)
+from common.simnet import SimNetwork
+from common.simulator import PriceSimulator
+
+USER_ADDRESS = "0x1234567890123456789012345678901234567890"
+
+def percentiles(samples):
+    if not samples:
+        return "n/a"
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:8.2f}ms  p95 {p95:8.2f}ms  p99 {p99:8.2f}ms  max {values.max():8.2f}ms"
+
+class LoadClient:
+    """Fires requests and records end-to-end latencies"""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self._senders = itertools.cycle(nodes)
+        self.tick_started = 0.0
+        self.portfolio_sent = deque()
+        self.task_sent = {}
+        self.trade_origin = {}
+        self.latency = {"portfolio": [], "task": [], "tick_to_alert": [], "tick_to_trade": []}
+        self.rejected = {flow: 0 for flow in self.latency}
+
+        for node in nodes:
+            node.on_message(PortfolioResponse, self.on_portfolio_response)
+            node.on_message(PriceAlertTriggered, self.on_alert)
+            node.on_message(TaskResult, self.on_task_result)
+            node.on_message(RequestRejected, self.on_rejected)
+
+    def send(self, destination, message):
+        """Send from the next client address in turn"""
+        node = next(self._senders)
+        node.network.deliver(node.address, destination, message)
+
+    async def on_portfolio_response(self, ctx, sender, msg):
+        # The portfolio manager answers in arrival order and carries no request id
+        self.latency["portfolio"].append(time.perf_counter() - self.portfolio_sent.popleft())
+
+    async def on_rejected(self, ctx, sender, msg):
+        if msg.request == PortfolioRequest.__name__:
+            self.portfolio_sent.popleft()
+            self.rejected["portfolio"] += 1
+        elif msg.request == PriceAlert.__name__:
+            self.rejected["tick_to_alert"] += 1
+
+    async def on_alert(self, ctx, sender, msg):
+        now = time.perf_counter()
+        self.latency["tick_to_alert"].append(now - self.tick_started)
+        task_id = f"alert_{msg.alert_id}"
+        self.trade_origin[task_id] = self.tick_started
+        await ctx.send("executor", ExecutionTask(
+            task_id=task_id,
+            task_type=TaskType.TRADE,
+            user_address=msg.user_address,
+            parameters={"symbol": msg.symbol, "amount": 0.1, "price": msg.price, "side": "buy"},
+        ))
+
+    async def on_task_result(self, ctx, sender, msg):
+        now = time.perf_counter()
+        rejected = msg.status == TaskStatus.REJECTED
+        if msg.task_id in self.trade_origin:
+            started = self.trade_origin.pop(msg.task_id)
+            flow = "tick_to_trade"
+        elif msg.task_id in self.task_sent:
+            started = self.task_sent.pop(msg.task_id)
+            flow = "task"
+        else:
+            return
+        if rejected:
+            self.rejected[flow] += 1
+        else:
+            self.latency[flow].append(now - started)
+
+    def portfolio_request(self, rng):
+        self.portfolio_sent.append(time.perf_counter())
+        self.send("portfolio_manager", PortfolioRequest(
+            user_address=USER_ADDRESS,
+            risk_level=rng.choice(["low", "medium", "high"]),
+            amount=rng.uniform(100, 100_000),
+        ))
+
+    def price_alert(self, rng, index, symbols, prices):
+        i = rng.randrange(len(symbols))
+        above = rng.random() < 0.5
+        # Targets within ~1% of the current price so alerts fire during the run
+        target = prices[i] * (1 + rng.uniform(0.001, 0.01) * (1 if above else -1))
+        self.send("price_monitor", PriceAlert(
+            symbol=symbols[i],
+            target_price=float(target),
+            condition="above" if above else "below",
+            user_address=f"0x{index:040x}",
+            alert_id=f"load_{index}",
+        ))
+
+    def execution_task(self, rng, index):
+        task_id = f"load_task_{index}"
+        self.task_sent[task_id] = time.perf_counter()
+        self.send("executor", ExecutionTask(
+            task_id=task_id,
+            task_type=rng.choice([TaskType.TRADE, TaskType.STAKE, TaskType.SWAP]),
+            user_address=f"0x{rng.randrange(1000):040x}",
+            parameters={"symbol": "ETH", "amount": 1.0},
+        ))
+
+def build_network(args):
+    """Load the three agents and wire their handlers onto a simulated network"""
+    portfolio = load_agent_module("portfolio_manager")
+    price = load_agent_module("price_monitor")
+    executor = load_agent_module("executor")
+
+    executor.EXECUTION_DELAY_SCALE = args.execution_delay_scale
+    portfolio.get_risk_engine().n_paths = args.var_paths
+    for module in (portfolio, price, executor):
+        module.ADMISSION.enabled = not args.no_admission
+
+    net = SimNetwork(log_level=logging.WARNING if not args.verbose else logging.INFO)
+    # Attach the agents' own handlers; no networked uagents.Agent is built
+    nodes = {
+        "portfolio_manager": portfolio.portfolio_agent.attach(net.add_node("portfolio_manager")),
+        "price_monitor": price.price_agent.attach(net.add_node("price_monitor")),
+        "executor": executor.executor_agent.attach(net.add_node("executor")),
+    }
+    client = LoadClient([net.add_node(f"load_client_{i}") for i in range(max(1, args.clients))])
+    return net, nodes, client, price
+
+async def run(args):
+    rng = random.Random(args.seed)
+    net, nodes, client, price = build_network(args)
+
+    if args.ticks:
+        symbols, ticks = load_price_history(args.ticks)
+    else:
+        simulator = PriceSimulator.from_assets(
+            price.MOCK_PRICES, tick_seconds=args.tick_seconds, seed=args.seed
+        )
+        symbols, ticks = simulator.symbols, simulator.generate(args.tick_count)
+
+    # Replay ticks through the price monitor's own fetch path
+    current = {}
+
+    async def replay_fetch():
+        return {
+            symbol: {
+                "price": float(value),
+                "change_24h": price.MOCK_PRICES.get(symbol, {}).get("change_24h", 0.0),
+                "volume_24h": price.MOCK_PRICES.get(symbol, {}).get("volume_24h", 0.0),
+            }
+            for symbol, value in current.items()
+        }
+
+    price.fetch_price_data = replay_fetch
+    price.TRACKED_SYMBOLS = list(symbols)
+
+    net.start()
+    await price.announce_codecs(nodes["price_monitor"].ctx)
+    await net.idle()
+
+    interval = args.tick_seconds / args.speedup
+    duration = interval * len(ticks)
+    print(f"⚡ Replaying {len(ticks)} ticks of {len(symbols)} symbols every {interval * 1000:.1f}ms "
+          f"({args.speedup:g}x), ~{duration:.1f}s")
+    print(f"   Load: {args.portfolio_requests} portfolio requests, {args.alerts} alerts, {args.tasks} tasks")
+    print("=" * 50)
+
+    # Spread the request load evenly across the replay
+    schedule = (
+        [("portfolio", i) for i in range(args.portfolio_requests)]
+        + [("alert", i) for i in range(args.alerts)]
+        + [("task", i) for i in range(args.tasks)]
+    )
+    rng.shuffle(schedule)
+    per_tick = -(-len(schedule) // len(ticks)) if schedule else 0
+
+    started = time.perf_counter()
+    for t, row in enumerate(ticks):
+        current.update(zip(symbols, row))
+        for kind, index in schedule[t * per_tick:(t + 1) * per_tick]:
+            if kind == "portfolio":
+                client.portfolio_request(rng)
+            elif kind == "alert":
+                client.price_alert(rng, index, symbols, row)
+            else:
+                client.execution_task(rng, index)
+
+        client.tick_started = time.perf_counter()
+        await price.update_prices(nodes["price_monitor"].ctx)
+
+        # Keep to the replay clock without drifting
+        next_tick = started + (t + 1) * interval
+        await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    try:
+        await asyncio.wait_for(net.idle(), args.drain_timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️  Inboxes still busy after {args.drain_timeout:.0f}s drain timeout")
+    elapsed = time.perf_counter() - started
+    await net.stop()
+
+    print(f"{'flow':<16}{'count':>8}{'rejected':>10}  latency")
+    for flow, samples in client.latency.items():
+        print(f"{flow:<16}{len(samples):>8}{client.rejected[flow]:>10}  {percentiles(samples)}")
+
+    delivered = sum(n.delivered for n in set(net.nodes.values()))
+    unhandled = sum(n.unhandled for n in set(net.nodes.values()))
+    print("=" * 50)
+    print(f"📊 {delivered} messages handled in {elapsed:.2f}s ({delivered / elapsed:,.0f} msg/s), "
+          f"{unhandled} without a handler, {net.dropped} undeliverable")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=Path, help="Recorded prices (.csv or .json); simulated if omitted")
+    parser.add_argument("--tick-count", type=int, default=200, help="Simulated ticks to generate")
+    parser.add_argument("--tick-seconds", type=float, default=30.0, help="Seconds between recorded ticks")
+    parser.add_argument("--speedup", type=float, default=600.0, help="Replay speed-up over real time")
+    parser.add_argument("--clients", type=int, default=50, help="Distinct sender addresses sharing the load")
+    parser.add_argument("--no-admission", action="store_true", help="Disable the agents' rate limits")
+    parser.add_argument("--portfolio-requests", type=int, default=1000)
+    parser.add_argument("--alerts", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--execution-delay-scale", type=float, default=0.001,
+                        help="Multiplier on the executor's simulated execution delays")
+    parser.add_argument("--var-paths", type=int, default=10_000, help="Monte Carlo paths per VaR")
+    parser.add_argument("--drain-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
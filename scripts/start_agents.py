@@ -1,81 +1,276 @@
 #!/usr/bin/env python3
 """
-Script to start all AgentGrid agents
+Script to start all AgentGrid agents, each in its own supervised process
 """
 
+import argparse
 import asyncio
-import subprocess
-import sys
 import os
+import signal
+import sys
+import time
 from pathlib import Path
+from typing import Dict, List, Optional
 
 # Add the agents directory to the Python path
 agents_dir = Path(__file__).parent.parent / "agents"
 sys.path.insert(0, str(agents_dir))
 
-async def start_agent(agent_name, port):
-    """Start a single agent"""
-    print(f"Starting {agent_name} on port {port}...")
-    
+from common.loader import AGENTS_DIR, agent_path
+from common.sharding import ROUTER_PORT, ROUTER_SEED
+
+# First port handed out to executor replicas beyond the primary one
+EXECUTOR_REPLICA_BASE_PORT = 8100
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+class AgentProcess:
+    """One supervised agent process and its restart bookkeeping"""
+
+    def __init__(self, name: str, script: Path, port: int, env: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.script = script
+        self.port = port
+        self.env = env or {}
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.relay: Optional[asyncio.Task] = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.failed_checks = 0
+        self.backoff = 0.0
+        self.last_cpu = (0.0, 0.0)  # (cpu seconds, wall time) at last report
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self):
+        """Spawn the agent script with its own interpreter"""
+        await self._stop_relay()  # the previous run's relay, after a crash
+        env = {**os.environ, **self.env, "PYTHONUNBUFFERED": "1"}
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, str(self.script),
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+        )
+        self.started_at = time.monotonic()
+        self.failed_checks = 0
+        self.last_cpu = (0.0, time.monotonic())
+        self.relay = asyncio.create_task(self._relay_output(self.process))
+        print(f"🚀 Started {self.name} (pid {self.pid}) on port {self.port}")
+
+    async def _relay_output(self, process: asyncio.subprocess.Process):
+        """Prefix child output with the agent name"""
+        while True:
+            line = await process.stdout.readline()
+            if not line:
+                break
+            print(f"[{self.name}] {line.decode(errors='replace').rstrip()}")
+
+    async def stop(self, timeout: float):
+        """SIGINT the process, escalating to SIGKILL after ``timeout`` seconds
+
+        uagents only shuts down cleanly on KeyboardInterrupt, so SIGINT is
+        what runs the agents' shutdown handlers (e.g. the final snapshot);
+        SIGTERM would kill them without it.
+        """
+        if self.running:
+            self.process.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️  {self.name} did not exit in {timeout:.0f}s, killing")
+                self.process.kill()
+                await self.process.wait()
+        await self._stop_relay()
+
+    async def _stop_relay(self):
+        """Wait for the output relay to drain, cancelling it if it hangs"""
+        if self.relay is None:
+            return
+        try:
+            await asyncio.wait_for(self.relay, 1.0)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+        self.relay = None
+
+    def usage(self) -> Optional[Dict[str, float]]:
+        """CPU percent since the last call and resident memory in MB"""
+        if not self.running:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                # Fields after the parenthesised command name; utime/stime are 14/15
+                fields = f.read().rsplit(")", 1)[1].split()
+            cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+            with open(f"/proc/{self.pid}/status") as f:
+                rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration, IndexError, ValueError):
+            return None
+
+        now = time.monotonic()
+        last_seconds, last_wall = self.last_cpu
+        self.last_cpu = (cpu_seconds, now)
+        elapsed = now - last_wall
+        cpu_percent = 100.0 * (cpu_seconds - last_seconds) / elapsed if elapsed > 0 else 0.0
+        return {"cpu_percent": cpu_percent, "rss_mb": rss_kb / 1024}
+
+async def port_is_open(port: int, timeout: float = 1.0) -> bool:
+    """Health probe: can we open a TCP connection to the agent's server?"""
     try:
-        # Import and run the agent
-        if agent_name == "portfolio_manager":
-            from portfolio_manager.agent import portfolio_agent
-            await portfolio_agent.run()
-        elif agent_name == "price_monitor":
-            from price_monitor.agent import price_agent
-            await price_agent.run()
-        elif agent_name == "executor":
-            from executor.agent import executor_agent
-            await executor_agent.run()
-        else:
-            print(f"Unknown agent: {agent_name}")
-            return False
-            
-    except Exception as e:
-        print(f"Error starting {agent_name}: {e}")
+        _, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), timeout)
+    except (OSError, asyncio.TimeoutError):
         return False
-    
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
     return True
 
-async def main():
-    """Start all agents concurrently"""
-    agents = [
-        ("portfolio_manager", 8001),
-        ("price_monitor", 8002),
-        ("executor", 8003),
+class Supervisor:
+    """Keeps agent processes alive with health checks and restart backoff"""
+
+    def __init__(self, processes: List[AgentProcess], args: argparse.Namespace):
+        self.processes = processes
+        self.args = args
+        self.stopping = asyncio.Event()
+
+    async def run(self):
+        for proc in self.processes:
+            await proc.start()
+
+        monitors = [asyncio.create_task(self._supervise(proc)) for proc in self.processes]
+        reporter = asyncio.create_task(self._report())
+
+        await self.stopping.wait()
+        print("\n🛑 Stopping agents...")
+        reporter.cancel()
+        for task in monitors:
+            task.cancel()
+        await asyncio.gather(*(p.stop(self.args.shutdown_timeout) for p in self.processes))
+        print("👋 All agents stopped")
+
+    async def _supervise(self, proc: AgentProcess):
+        """Restart ``proc`` when it exits or repeatedly fails health checks"""
+        while not self.stopping.is_set():
+            await asyncio.sleep(self.args.health_interval)
+
+            healthy = proc.running
+            in_grace = time.monotonic() - proc.started_at < self.args.startup_grace
+            if healthy and not in_grace:
+                if await port_is_open(proc.port):
+                    proc.failed_checks = 0
+                else:
+                    proc.failed_checks += 1
+                    healthy = proc.failed_checks < self.args.max_failed_checks
+            if healthy:
+                # Forget earlier crashes once the process has been stable for a while
+                if time.monotonic() - proc.started_at > self.args.stable_after:
+                    proc.backoff = 0.0
+                continue
+
+            if proc.running:
+                print(f"❌ {proc.name} failed {proc.failed_checks} health checks")
+                await proc.stop(self.args.shutdown_timeout)
+            else:
+                print(f"❌ {proc.name} exited with code {proc.process.returncode}")
+
+            proc.backoff = min(
+                max(proc.backoff * 2, self.args.backoff_initial), self.args.backoff_max
+            )
+            print(f"🔁 Restarting {proc.name} in {proc.backoff:.1f}s")
+            try:
+                await asyncio.wait_for(self.stopping.wait(), proc.backoff)
+                return
+            except asyncio.TimeoutError:
+                pass
+            proc.restarts += 1
+            await proc.start()
+
+    async def _report(self):
+        """Periodically print per-process CPU and RSS"""
+        while True:
+            await asyncio.sleep(self.args.report_interval)
+            print("📊 " + " | ".join(self._format_usage(p) for p in self.processes))
+
+    @staticmethod
+    def _format_usage(proc: AgentProcess) -> str:
+        usage = proc.usage()
+        if usage is None:
+            return f"{proc.name}: down"
+        return (
+            f"{proc.name}: pid {proc.pid} cpu {usage['cpu_percent']:.1f}% "
+            f"rss {usage['rss_mb']:.1f}MB restarts {proc.restarts}"
+        )
+
+def router_address() -> str:
+    """Agent address of the shard router, derived from its seed"""
+    from uagents_core.identity import Identity
+    return Identity.from_seed(ROUTER_SEED, 0).address
+
+def build_processes(executor_replicas: int, sharded: bool) -> List[AgentProcess]:
+    """Process table: one per agent plus extra executor replicas"""
+    executor_env = {"EXECUTOR_ROUTER": router_address()} if sharded else {}
+    processes = [
+        AgentProcess("portfolio_manager", agent_path("portfolio_manager"), 8001),
+        AgentProcess("price_monitor", agent_path("price_monitor"), 8002),
+        AgentProcess("executor", agent_path("executor"), 8003, env=executor_env),
     ]
-    
+    for replica in range(1, executor_replicas):
+        port = EXECUTOR_REPLICA_BASE_PORT + replica
+        processes.append(AgentProcess(
+            f"executor_{replica}",
+            agent_path("executor"),
+            port,
+            env={**executor_env, "EXECUTOR_REPLICA": str(replica), "EXECUTOR_PORT": str(port)},
+        ))
+    if sharded:
+        processes.append(AgentProcess(
+            "executor_router", AGENTS_DIR / "executor" / "router.py", ROUTER_PORT
+        ))
+    return processes
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--executor-replicas", type=int, default=1)
+    parser.add_argument("--sharded", action="store_true", help="Run executors as shards behind a router")
+    parser.add_argument("--health-interval", type=float, default=5.0)
+    parser.add_argument("--startup-grace", type=float, default=15.0)
+    parser.add_argument("--max-failed-checks", type=int, default=3)
+    parser.add_argument("--backoff-initial", type=float, default=1.0)
+    parser.add_argument("--backoff-max", type=float, default=60.0)
+    parser.add_argument("--stable-after", type=float, default=60.0)
+    parser.add_argument(
+        "--shutdown-timeout", type=float, default=60.0,
+        help="Seconds to wait after SIGINT before SIGKILL; uagents allows up to 60s for shutdown handlers",
+    )
+    parser.add_argument("--report-interval", type=float, default=30.0)
+    return parser.parse_args()
+
+async def main():
+    """Start all agents as separate supervised processes"""
+    args = parse_args()
+    processes = build_processes(max(1, args.executor_replicas), args.sharded)
+
     print("🤖 Starting AgentGrid agents...")
     print("=" * 50)
-    
-    # Start all agents concurrently
-    tasks = []
-    for agent_name, port in agents:
-        task = asyncio.create_task(start_agent(agent_name, port))
-        tasks.append(task)
-    
-    # Wait for all agents to start
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # Check results
-    success_count = sum(1 for result in results if result is True)
-    total_count = len(agents)
-    
-    print("=" * 50)
-    if success_count == total_count:
-        print(f"✅ All {total_count} agents started successfully!")
-    else:
-        print(f"⚠️  {success_count}/{total_count} agents started successfully")
-        print("Check the logs above for any errors")
-    
-    # Keep the script running
-    try:
-        await asyncio.Event().wait()
-    except KeyboardInterrupt:
-        print("\n🛑 Stopping agents...")
-        for task in tasks:
-            task.cancel()
+
+    supervisor = Supervisor(processes, args)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, supervisor.stopping.set)
+        except NotImplementedError:
+            # Windows: fall back to KeyboardInterrupt
+            pass
+
+    await supervisor.run()
 
 if __name__ == "__main__":
     try:
@@ -5,17 +5,17 @@ Script to test AgentGrid agents
 
 import asyncio
 import json
+import random
 import sys
+import time
 from pathlib import Path
 
 # Add the agents directory to the Python path
 agents_dir = Path(__file__).parent.parent / "agents"
 sys.path.insert(0, str(agents_dir))
 
-from uagents import Agent, Context
-from portfolio_manager.agent import PortfolioRequest, PortfolioResponse
-from price_monitor.agent import PriceData
-from executor.agent import ExecutionTask, TaskResult, TaskType
+from common.loader import load_agent_module
+from common.models import ExecutionTask, PortfolioRequest, PriceAlert, PriceData, TaskType
 
 async def test_portfolio_agent():
     """Test the portfolio manager agent"""
@@ -118,9 +118,9 @@ async def test_agent_communication():
     
     try:
         # Test that agents can be imported and instantiated
-        from portfolio_manager.agent import portfolio_agent
-        from price_monitor.agent import price_agent
-        from executor.agent import executor_agent
+        portfolio_agent = load_agent_module("portfolio_manager").portfolio_agent
+        price_agent = load_agent_module("price_monitor").price_agent
+        executor_agent = load_agent_module("executor").executor_agent
         
         print("  📡 Portfolio Agent: ✅")
         print("  📡 Price Monitor Agent: ✅")
@@ -138,6 +138,608 @@ async def test_agent_communication():
         print(f"  ❌ Agent communication test failed: {e}")
         return False
 
+async def test_message_flow():
+    """Test price -> alert -> trade flow on the simulated network"""
+    print("🧪 Testing Message Flow...")
+    
+    try:
+        from argparse import Namespace
+        from load_test import build_network
+        
+        args = Namespace(execution_delay_scale=0.0, var_paths=1000, clients=1, no_admission=False, verbose=False)
+        net, nodes, client, price = build_network(args)
+        net.start()
+        
+        # One alert that the next price cycle is guaranteed to trigger
+        client.send("price_monitor", PriceAlert(
+            symbol="BTC",
+            target_price=1.0,
+            condition="above",
+            user_address="0x1234567890123456789012345678901234567890",
+            alert_id="flow_test_alert"
+        ))
+        client.portfolio_request(random.Random(0))
+        await net.idle()
+        
+        client.tick_started = time.perf_counter()
+        await price.update_prices(nodes["price_monitor"].ctx)
+        await net.idle()
+        await net.stop()
+        
+        print(f"  📡 Alerts triggered: {len(client.latency['tick_to_alert'])}")
+        print(f"  📡 Trades executed: {len(client.latency['tick_to_trade'])}")
+        
+        assert len(client.latency["portfolio"]) == 1
+        assert len(client.latency["tick_to_alert"]) == 1
+        assert len(client.latency["tick_to_trade"]) == 1
+        
+        print("  ✅ Message flow test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Message flow test failed: {e}")
+        return False
+
+async def test_snapshot_restore():
+    """Test warm restart of price monitor and portfolio state from snapshots"""
+    print("🧪 Testing Snapshot Restore...")
+    
+    try:
+        import copy
+        import tempfile
+        from common.snapshot import Snapshotter
+        
+        price = load_agent_module("price_monitor")
+        portfolio = load_agent_module("portfolio_manager")
+        
+        # The agents' state is module-global; put it back so later tests see it untouched
+        saved_globals = [
+            (state, copy.deepcopy(state))
+            for state in (price.PRICE_DATA, price.ALERTS, price.ALERTS_PER_SENDER, price.MOCK_PRICES, portfolio.CRYPTO_ASSETS)
+        ]
+        saved_snapshotters = price.SNAPSHOT, portfolio.SNAPSHOT
+        saved_history = portfolio.RISK_ENGINE.history_snapshot() if portfolio.RISK_ENGINE else None
+        try:
+            with tempfile.TemporaryDirectory() as state_dir:
+                price.SNAPSHOT = Snapshotter("price_monitor", 1, directory=Path(state_dir))
+                portfolio.SNAPSHOT = Snapshotter("portfolio_manager", 1, directory=Path(state_dir))
+                
+                price.PRICE_DATA["BTC"] = {
+                    "symbol": "BTC", "price": 51000.0, "change_24h": 1.5,
+                    "volume_24h": 2.5e10, "market_cap": 5.1e10, "timestamp": "2024-01-15T10:30:00"
+                }
+                price.ALERTS.setdefault("ETH", {})["snapshot_alert"] = {
+                    "target_price": 4000.0, "condition": "above", "user_address": "0x" + "1" * 40,
+                    "notify": "sim://client", "created_at": "2024-01-15T10:30:00"
+                }
+                portfolio.CRYPTO_ASSETS["ETH"]["price"] = 3210.0
+                assert price.SNAPSHOT.save(price.snapshot_state())
+                assert portfolio.SNAPSHOT.save(portfolio.snapshot_state())
+                
+                # Simulate a restart: drop in-memory state, then restore
+                price.PRICE_DATA.clear()
+                price.ALERTS.clear()
+                price.ALERTS_PER_SENDER.clear()
+                portfolio.CRYPTO_ASSETS["ETH"]["price"] = 3000.0
+                
+                started = time.perf_counter()
+                price.restore_state(Snapshotter("price_monitor", 1, directory=Path(state_dir)).load())
+                portfolio.restore_state(Snapshotter("portfolio_manager", 1, directory=Path(state_dir)).load())
+                elapsed = time.perf_counter() - started
+                
+                print(f"  💾 Restored in {elapsed * 1000:.2f}ms")
+                
+                assert price.PRICE_DATA["BTC"]["price"] == 51000.0
+                assert "snapshot_alert" in price.ALERTS["ETH"]
+                assert price.ALERTS_PER_SENDER["sim://client"] == 1
+                assert portfolio.CRYPTO_ASSETS["ETH"]["price"] == 3210.0
+                # A snapshot under another schema is ignored
+                assert Snapshotter("price_monitor", 2, directory=Path(state_dir)).load() is None
+        finally:
+            for state, saved in saved_globals:
+                state.clear()
+                state.update(saved)
+            price.SNAPSHOT, portfolio.SNAPSHOT = saved_snapshotters
+            if portfolio.RISK_ENGINE:
+                portfolio.RISK_ENGINE.restore_history(saved_history or {})
+            price.ACTIVE_ALERTS.set(price.alert_count())
+        
+        print("  ✅ Snapshot restore test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Snapshot restore test failed: {e}")
+        return False
+
+async def test_risk_engine():
+    """Test VaR accuracy and the risk engine's cached Cholesky factor"""
+    print("🧪 Testing Risk Engine...")
+    
+    try:
+        import math
+        import numpy as np
+        from common.risk import DAYS_PER_YEAR, RiskEngine
+        
+        # One asset: Monte Carlo VaR matches the analytic lognormal VaR
+        volatility = 0.8
+        engine = RiskEngine({"BTC": {"price": 45000.0, "volatility": volatility}}, n_paths=200_000, seed=1)
+        sigma = volatility * math.sqrt(1.0 / DAYS_PER_YEAR)
+        analytic = -math.expm1(-1.6448536 * sigma) * 1000
+        var_95, cvar_95 = engine.value_at_risk({"BTC": 1.0}, 1000.0, 0.95)
+        print(f"  📉 VaR {var_95:.2f} vs analytic {analytic:.2f}")
+        assert abs(var_95 - analytic) / analytic < 0.03
+        assert cvar_95 > var_95
+        # Scenarios are cached, so the same request gets the same answer
+        assert engine.value_at_risk({"BTC": 1.0}, 1000.0, 0.95) == (var_95, cvar_95)
+        
+        # Historical VaR needs min_history returns, then takes over
+        assets = {
+            "BTC": {"price": 45000.0, "volatility": 0.8, "correlation": 0.1},
+            "USDC": {"price": 1.0, "volatility": 0.01, "correlation": 0.0},
+        }
+        engine = RiskEngine(assets, n_paths=20_000, min_history=30, refresh_ticks=50, seed=1)
+        allocations = {"BTC": 0.5, "USDC": 0.5}
+        assert engine.historical_var(allocations) is None
+        
+        symbols, prior = engine.cholesky()
+        assert engine.cholesky()[1] is prior  # cached between valuations
+        prior_scenarios = engine.scenarios()[1]
+        assert engine.scenarios()[1] is prior_scenarios
+        
+        rng = np.random.default_rng(0)
+        price = 45000.0
+        for tick in range(30):
+            price *= math.exp(0.0005 * rng.standard_normal())
+            engine.update_price("BTC", price)
+            engine.update_price("USDC", 1.0 + 1e-5 * rng.standard_normal())
+        assert engine.cholesky()[1] is prior  # 30 prices are only 29 returns
+        
+        engine.update_price("BTC", price)
+        engine.update_price("USDC", 1.0)
+        estimated = engine.cholesky()[1]
+        assert estimated is not prior  # history reached min_history
+        assert engine.scenarios()[1] is not prior_scenarios  # redrawn with the factor
+        assert estimated[0, 0] < prior[0, 0]  # calm ticks beat the 80% vol prior
+        
+        historical = engine.historical_var(allocations)
+        assert historical is not None
+        var_95, _ = engine.value_at_risk(allocations, 1000.0, method="historical")
+        assert abs(var_95 - historical[0] * 1000.0) < 1e-9
+        
+        # Small moves keep the factor until refresh_ticks ticks have passed
+        for tick in range(49):
+            engine.update_price("BTC", price)
+            engine.update_price("USDC", 1.0)
+        assert engine.cholesky()[1] is estimated
+        engine.update_price("BTC", price)
+        engine.update_price("USDC", 1.0)
+        refreshed = engine.cholesky()[1]
+        assert refreshed is not estimated
+        
+        # A large move rebuilds immediately
+        engine.update_price("BTC", price * 1.1)
+        assert engine.cholesky()[1] is not refreshed
+        
+        print("  ✅ Risk engine test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Risk engine test failed: {e!r}")
+        return False
+
+async def test_hash_ring():
+    """Test consistent hashing of users onto executor shards"""
+    print("🧪 Testing Hash Ring...")
+    
+    try:
+        from common.sharding import HashRing
+        
+        assert HashRing().get("0xabc") is None
+        
+        keys = [f"0x{i:040x}" for i in range(5000)]
+        ring = HashRing(["shard_a", "shard_b", "shard_c", "shard_d"])
+        before = {key: ring.get(key) for key in keys}
+        assert before == {key: ring.get(key) for key in keys}  # stable lookups
+        assert set(before.values()) == set(ring.nodes)
+        
+        # Adding a fifth shard moves only the keys it takes over, about 1/5
+        ring.add("shard_e")
+        after_add = {key: ring.get(key) for key in keys}
+        moved = [key for key in keys if after_add[key] != before[key]]
+        assert all(after_add[key] == "shard_e" for key in moved)
+        print(f"  🔀 Add moved {len(moved) / len(keys):.1%} of keys")
+        assert 0.1 < len(moved) / len(keys) < 0.3
+        
+        # Removing it again returns every key to its original shard
+        ring.remove("shard_e")
+        assert {key: ring.get(key) for key in keys} == before
+        
+        # Removing a shard only moves that shard's keys
+        ring.remove("shard_a")
+        after_remove = {key: ring.get(key) for key in keys}
+        moved = [key for key in keys if after_remove[key] != before[key]]
+        assert all(before[key] == "shard_a" for key in moved)
+        assert "shard_a" not in after_remove.values()
+        print(f"  🔀 Remove moved {len(moved) / len(keys):.1%} of keys")
+        
+        assert not ring.add("shard_b") and not ring.remove("shard_a")
+        
+        print("  ✅ Hash ring test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Hash ring test failed: {e!r}")
+        return False
+
+async def test_admission_control():
+    """Test token buckets, admission control and fair queuing"""
+    print("🧪 Testing Admission Control...")
+    
+    try:
+        from common.ratelimit import (
+            GLOBAL_RATE, QUEUE_FULL, SENDER_QUEUE_FULL, SENDER_RATE,
+            AdmissionController, FairQueue, TokenBucket,
+        )
+        
+        # A full bucket allows a burst, then refills at its rate
+        bucket = TokenBucket(rate=2.0, burst=3, now=0.0)
+        for _ in range(3):
+            assert bucket.available(0.0)
+            bucket.take()
+        assert not bucket.available(0.0)
+        assert abs(bucket.retry_after() - 0.5) < 1e-9
+        assert bucket.available(0.5) and not bucket.available(0.5, tokens=2)
+        assert bucket.available(10.0, tokens=3) and not bucket.available(10.0, tokens=4)
+        
+        # One sender hits its own rate before the global one
+        admission = AdmissionController("Test", sender_rate=1e-6, sender_burst=2, global_rate=1e-6, global_burst=3)
+        assert admission.admit("alice") is None and admission.admit("alice") is None
+        assert admission.admit("alice") == SENDER_RATE
+        assert admission.retry_after > 0
+        # ...and other senders then share what is left of the global burst
+        assert admission.admit("bob") is None
+        assert admission.admit("carol") == GLOBAL_RATE
+        
+        # Idle senders are evicted least recently used first and start over
+        admission = AdmissionController("Test", sender_rate=1e-6, sender_burst=1, global_rate=1e6, global_burst=1e6, max_senders=2)
+        assert admission.admit("a") is None and admission.admit("b") is None
+        assert admission.admit("a") == SENDER_RATE  # touches a, so b is least recent
+        assert admission.admit("c") is None
+        assert len(admission) == 2
+        assert admission.admit("b") is None  # evicted, so b has a fresh bucket
+        assert admission.admit("c") == SENDER_RATE
+        
+        # Senders are served in turn, each one's items in order and one at a time
+        queue = FairQueue(max_depth=10, max_per_sender=5)
+        for sender, item in [("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"), ("c", "c1"), ("b", "b2")]:
+            assert queue.push(sender, item) is None
+        order = []
+        while queue.ready():
+            sender, key, item = queue.pop()
+            order.append(item)
+            queue.done(sender, key)
+        assert order == ["a1", "b1", "c1", "a2", "b2", "a3"], order
+        
+        assert queue.push("a", "low", priority=0) is None
+        assert queue.push("a", "high", priority=5) is None
+        assert queue.push("b", "urgent", priority=9) is None
+        assert queue.pop() == ("b", "b", "urgent")  # priority picks among senders
+        assert queue.pop() == ("a", "a", "low")  # but never reorders one key
+        assert not queue.ready()  # a and b are both in flight
+        queue.done("b")
+        assert not queue.ready()
+        queue.done("a")
+        assert queue.pop() == ("a", "a", "high")
+        queue.done("a")
+        
+        # One sender's items for different keys run concurrently, each key in order
+        queue = FairQueue(max_depth=10, max_per_sender=5)
+        for user, item in [("u1", "u1_0"), ("u1", "u1_1"), ("u2", "u2_0"), ("u3", "u3_0")]:
+            assert queue.push("client", item, key=user) is None
+        assert queue.push("other", "o1") is None
+        popped = [queue.pop() for _ in range(4)]
+        assert [item for _, _, item in popped] == ["u1_0", "o1", "u2_0", "u3_0"], popped
+        assert not queue.ready() and queue.pending("client") == 1  # u1_1 waits for u1_0
+        queue.done("client", "u1")
+        assert queue.pop() == ("client", "u1", "u1_1")
+        
+        # Per-sender and total caps
+        queue = FairQueue(max_depth=3, max_per_sender=2)
+        assert queue.push("a", 1) is None and queue.push("a", 2) is None
+        assert queue.push("a", 3) == SENDER_QUEUE_FULL
+        assert queue.push("b", 1) is None
+        assert queue.push("c", 1) == QUEUE_FULL
+        assert len(queue) == 3 and queue.senders() == 2 and queue.pending("a") == 2
+        
+        print("  ✅ Admission control test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Admission control test failed: {e!r}")
+        return False
+
+async def test_wire_codec():
+    """Test compact frame round-trips and codec negotiation"""
+    print("🧪 Testing Wire Codec...")
+    
+    try:
+        import msgpack
+        from common.models import PriceUpdate, TaskResult, TaskStatus, WireHello
+        from common.simnet import SimNetwork
+        from common.wire import (
+            CODEC_JSON, CODEC_MSGPACK, STATIC_SYMBOLS, WireNegotiator,
+            decode_frame, encode_frame, pack_messages, unpack_messages,
+        )
+        
+        updates = [
+            PriceUpdate(symbol="BTC", price=45000.5, timestamp="2024-01-15T10:30:00.123456", change_24h=2.5),
+            PriceUpdate(symbol="PEPE", price=0.00001, timestamp="2024-01-15T10:30:00.123456"),
+            PriceUpdate(symbol="PEPE", price=0.00002, timestamp="2024-01-15T10:30:00+02:00"),
+        ]
+        frame = encode_frame(updates)
+        _, fields, strings, rows = msgpack.unpackb(frame, raw=False)
+        symbol, timestamp = fields.index("symbol"), fields.index("timestamp")
+        # Tracked symbols use the static table, others the frame's own strings, once
+        assert rows[0][symbol] == STATIC_SYMBOLS.index("BTC")
+        assert strings == ["PEPE"] and rows[1][symbol] == rows[2][symbol] == len(STATIC_SYMBOLS)
+        # Naive timestamps travel as integers; aware ones keep their offset as text
+        assert isinstance(rows[0][timestamp], int) and rows[0][timestamp] == rows[1][timestamp]
+        assert rows[2][timestamp] == "2024-01-15T10:30:00+02:00"
+        assert decode_frame(frame, PriceUpdate) == updates
+        
+        results = [TaskResult(task_id="t1", status=TaskStatus.COMPLETED, result={"fees": 0.001}, timestamp="2024-01-15T10:30:00")]
+        for codec in (CODEC_MSGPACK, CODEC_JSON):
+            for messages in (updates, results):
+                packed = pack_messages(messages, codec)
+                assert packed.codec == codec and packed.count == len(messages)
+                assert unpack_messages(packed, type(messages[0])) == messages
+        assert len(pack_messages(updates, CODEC_MSGPACK).payload) < len(pack_messages(updates, CODEC_JSON).payload)
+        
+        # Peers agree on the best shared codec; answers never ask for a reply
+        price_wire, portfolio_wire = WireNegotiator("price_monitor"), WireNegotiator("portfolio_manager")
+        assert price_wire.codec_for("portfolio_manager") is None
+        assert portfolio_wire.on_hello("sim://price_monitor", price_wire.hello())
+        assert not price_wire.on_hello("sim://portfolio_manager", portfolio_wire.hello(reply=False))
+        assert price_wire.codec_for("portfolio_manager") == CODEC_MSGPACK
+        assert portfolio_wire.codec_for("sim://price_monitor") == CODEC_MSGPACK
+        # A restarted peer is answered again even though we still know it
+        assert portfolio_wire.on_hello("sim://price_monitor", WireNegotiator("price_monitor").hello())
+        json_only = WireHello(agent_name="legacy", codecs=[CODEC_JSON])
+        portfolio_wire.on_hello("sim://legacy", json_only)
+        assert portfolio_wire.codec_for("legacy") == CODEC_JSON
+        
+        # The price monitor keeps saying hello until the portfolio manager answers
+        price = load_agent_module("price_monitor")
+        portfolio = load_agent_module("portfolio_manager")
+        saved_wires = price.WIRE, portfolio.WIRE
+        price.WIRE, portfolio.WIRE = WireNegotiator("price_monitor"), WireNegotiator("portfolio_manager")
+        try:
+            net = SimNetwork()
+            price_node = price.price_agent.attach(net.add_node("price_monitor"))
+            hellos = []
+            
+            async def record_hello(ctx, sender, msg):
+                hellos.append(msg)
+            
+            silent = net.add_node("portfolio_manager").on_message(WireHello, record_hello)
+            net.start()
+            await price.announce_codecs(price_node.ctx)
+            await price.retry_codecs(price_node.ctx)
+            await net.idle()
+            assert len(hellos) == 2 and all(h.reply for h in hellos)
+            
+            silent.on_message(WireHello, portfolio.handle_wire_hello)
+            await price.retry_codecs(price_node.ctx)
+            await net.idle()
+            assert price.WIRE.codec_for("portfolio_manager") == CODEC_MSGPACK
+            await price.retry_codecs(price_node.ctx)
+            await net.idle()
+            assert len(hellos) == 2
+            await net.stop()
+        finally:
+            price.WIRE, portfolio.WIRE = saved_wires
+        
+        print("  ✅ Wire codec test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Wire codec test failed: {e!r}")
+        return False
+
+async def test_router_static_shards():
+    """Test that static shards without heartbeats expire like any other"""
+    print("🧪 Testing Router Static Shards...")
+    
+    try:
+        import importlib.util
+        import os
+        from common.loader import AGENTS_DIR
+        from common.models import ExecutorStatus, ExecutorStatusRequest, ShardHeartbeat, TaskResult, TaskStatus
+        from common.simnet import SimNetwork
+        
+        spec = importlib.util.spec_from_file_location("test_executor_router", AGENTS_DIR / "executor" / "router.py")
+        router = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(router)
+        
+        net = SimNetwork()
+        node = router.router_agent.attach(net.add_node("executor_router"))
+        received = []
+        
+        async def record(ctx, sender, msg):
+            received.append(msg)
+        
+        net.add_node("client").on_message(TaskResult, record).on_message(ExecutorStatus, record)
+        for shard in ("shard_live", "shard_dead"):
+            net.add_node(shard, address=f"sim://{shard}").on_message(ExecutionTask, record)
+        net.start()
+        
+        saved = os.environ.get("EXECUTOR_SHARDS")
+        os.environ["EXECUTOR_SHARDS"] = "sim://shard_live, sim://shard_dead"
+        try:
+            await router.add_static_shards(node.ctx)
+        finally:
+            if saved is None:
+                del os.environ["EXECUTOR_SHARDS"]
+            else:
+                os.environ["EXECUTOR_SHARDS"] = saved
+        assert set(router.SHARDS) == {"sim://shard_live", "sim://shard_dead"}
+        assert "sim://shard_dead" in router.RING
+        
+        # Only the live shard ever sends a heartbeat
+        heartbeat = ShardHeartbeat(shard_id="shard_live", queue_depth=0, active_tasks=0,
+                                   completed_tasks=0, failed_tasks=0, timestamp="2024-01-15T10:30:00")
+        net.deliver("sim://shard_live", "executor_router", heartbeat)
+        net.deliver("client", "executor_router", ExecutorStatusRequest(request_id="status_1"))
+        await net.idle()
+        status = next(m for m in received if isinstance(m, ExecutorStatus))
+        assert list(status.shards) == ["shard_live"]
+        
+        # Give the dead shard one task, then let its registration age past the timeout
+        user = next(f"0x{i:040x}" for i in range(1000) if router.RING.get(f"0x{i:040x}") == "sim://shard_dead")
+        net.deliver("client", "executor_router", ExecutionTask(
+            task_id="stranded", task_type=TaskType.TRADE, user_address=user, parameters={}
+        ))
+        await net.idle()
+        router.SHARDS["sim://shard_dead"] = (time.monotonic() - router.SHARD_TIMEOUT - 1, None)
+        await router.expire_shards(node.ctx)
+        await net.idle()
+        await net.stop()
+        
+        assert "sim://shard_dead" not in router.RING and "sim://shard_dead" not in router.SHARDS
+        assert "sim://shard_live" in router.RING
+        assert router.RING.get(user) == "sim://shard_live"
+        failed = [m for m in received if isinstance(m, TaskResult)]
+        assert [(m.task_id, m.status) for m in failed] == [("stranded", TaskStatus.FAILED)]
+        assert not router.PENDING_TASKS and not router.USER_INFLIGHT
+        
+        print("  ✅ Router static shards test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Router static shards test failed: {e!r}")
+        return False
+
+def single_asset_allocator(risk_level, amount):
+    return {"A": amount}
+
+def even_allocator(risk_level, amount):
+    return {"A": amount / 2, "B": amount / 2}
+
+async def test_backtest():
+    """Test backtest fees, drawdown, Sharpe ratio, grid ordering and input checks"""
+    print("🧪 Testing Backtest...")
+    
+    try:
+        import math
+        import tempfile
+        import numpy as np
+        from common.backtest import (
+            TRADE_FEE_RATE, StrategyConfig, load_price_history, max_drawdown,
+            run_backtest, run_grid, sharpe_ratio,
+        )
+        
+        assert abs(max_drawdown(np.array([100.0, 120.0, 90.0, 130.0, 117.0])) - 0.25) < 1e-12
+        assert max_drawdown(np.array([1.0, 2.0, 3.0])) == 0.0
+        expected = 0.015 / (0.01 / math.sqrt(2)) * math.sqrt(4)  # returns of 1% then 2%
+        assert abs(sharpe_ratio(np.array([100.0, 101.0, 103.02]), 4) - expected) < 1e-9
+        assert sharpe_ratio(np.array([100.0, 100.0, 100.0]), 4) == 0.0
+        
+        # Flat prices: the opening trade pays the fee, then nothing changes
+        config = StrategyConfig(initial_capital=1000.0)
+        flat = run_backtest(np.ones((5, 1)), ["A"], config, single_asset_allocator, 365.0)
+        assert flat.trades == 1 and abs(flat.fees_paid - 1000.0 * TRADE_FEE_RATE) < 1e-9
+        assert np.allclose(flat.equity_curve, 1000.0 * (1 - TRADE_FEE_RATE))
+        assert flat.max_drawdown == 0.0 and flat.sharpe_ratio == 0.0
+        
+        # A doubles: the drift rebalance pays the fee on the turnover back to 50/50
+        prices = np.array([[1.0, 1.0], [2.0, 1.0]])
+        result = run_backtest(prices, ["A", "B"], config, even_allocator, 365.0)
+        opening_fee = 1000.0 * TRADE_FEE_RATE
+        value = 999.0 / 2 * 3  # 499.5 units of A at 2 plus 499.5 of B at 1
+        rebalance_fee = (value / 2 - 999.0 / 2) * 2 * TRADE_FEE_RATE
+        assert result.trades == 4
+        assert abs(result.fees_paid - (opening_fee + rebalance_fee)) < 1e-9
+        assert abs(result.equity_curve[-1] - (value - rebalance_fee)) < 1e-9
+        
+        # Results come back in config order, from the pool as well
+        configs = [StrategyConfig(fee_rate=rate, initial_capital=1000.0) for rate in (0.01, 0.0, 0.005, 0.001)]
+        walk = np.cumprod(1 + np.random.default_rng(0).normal(0, 0.02, (60, 2)), axis=0)
+        for workers in (1, 2):
+            grid = run_grid(walk, ["A", "B"], configs, 365.0, allocator=even_allocator, workers=workers)
+            assert [r.config for r in grid] == configs
+            assert [round(r.fees_paid, 9) for r in grid] == [
+                round(run_backtest(walk, ["A", "B"], c, even_allocator, 365.0).fees_paid, 9) for c in configs
+            ]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "prices.csv"
+            path.write_text("timestamp,A,B\n1,1.0,2.0\n2,0.0,2.1\n")
+            try:
+                load_price_history(path)
+            except ValueError as e:
+                assert "A at tick 1" in str(e)
+            else:
+                raise AssertionError("zero price was accepted")
+        
+        print("  ✅ Backtest test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Backtest test failed: {e!r}")
+        return False
+
+async def test_price_simulator():
+    """Test simulator reproducibility, correlation and GARCH variance"""
+    print("🧪 Testing Price Simulator...")
+    
+    try:
+        import numpy as np
+        from common.portfolio import CRYPTO_ASSETS
+        from common.simulator import PriceSimulator
+        
+        # Same seed, same path; another seed, another path
+        first = PriceSimulator.from_assets(CRYPTO_ASSETS, seed=42).generate(500)
+        assert np.array_equal(first, PriceSimulator.from_assets(CRYPTO_ASSETS, seed=42).generate(500))
+        assert not np.array_equal(first, PriceSimulator.from_assets(CRYPTO_ASSETS, seed=43).generate(500))
+        assert (first > 0).all() and np.isfinite(first).all()
+        
+        target = 0.7
+        simulator = PriceSimulator(
+            ["A", "B"], prices=[100.0, 50.0], volatilities=[0.8, 0.5],
+            correlation=np.array([[1.0, target], [target, 1.0]]), seed=7,
+        )
+        variances = np.empty((20_000, 2))
+        log_prices = np.empty((20_001, 2))
+        log_prices[0] = simulator.log_prices
+        for t in range(20_000):
+            simulator.step()
+            variances[t] = simulator.variance
+            log_prices[t + 1] = simulator.log_prices
+        
+        sampled = np.corrcoef(np.diff(log_prices, axis=0), rowvar=False)[0, 1]
+        print(f"  🔗 Correlation {sampled:.3f} vs target {target}")
+        assert abs(sampled - target) < 0.05
+        
+        # GARCH variance stays positive, bounded and centred on the long-run level
+        ratio = variances / simulator.long_run_var
+        print(f"  📈 Variance / long-run: min {ratio.min():.2f}, mean {ratio.mean():.2f}, max {ratio.max():.2f}")
+        assert (variances > 0).all() and np.isfinite(variances).all()
+        assert ratio.min() >= 1 - simulator.alpha - simulator.beta - 1e-12  # omega is the floor
+        assert ratio.max() < 20
+        assert abs(ratio.mean() - 1.0) < 0.2
+        
+        # Without GARCH terms the variance never moves
+        gbm = PriceSimulator(["A"], prices=[100.0], volatilities=[0.8], garch_alpha=0.0, garch_beta=0.0, seed=1)
+        gbm.generate(100)
+        assert np.allclose(gbm.variance, gbm.long_run_var)
+        
+        print("  ✅ Price simulator test passed")
+        return True
+        
+    except Exception as e:
+        print(f"  ❌ Price simulator test failed: {e!r}")
+        return False
+
 async def main():
     """Run all agent tests"""
     print("🚀 Starting AgentGrid Agent Tests")
@@ -148,6 +750,15 @@ async def main():
         test_price_agent,
         test_executor_agent,
         test_agent_communication,
+        test_message_flow,
+        test_snapshot_restore,
+        test_risk_engine,
+        test_hash_ring,
+        test_admission_control,
+        test_wire_codec,
+        test_router_static_shards,
+        test_backtest,
+        test_price_simulator,
     ]
     
     results = []